@@ -0,0 +1,100 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import csv
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pygame.math import Vector2
+from time import perf_counter
+from data.game import Game
+from data.game import PARAMETER_MINIMUMS
+from data.game import PARAMETERS
+from data.policy import POLICIES
+
+"""batch simulation script, runs many seeded headless games across a process pool"""
+
+SURFACE_SIZE = Vector2(1024, 768)
+
+def run_game(seed: int, params: dict, policy: str, frames: int, entity_store: bool) -> dict:
+    """simulates one game until the player dies or frames run out, returns its results"""
+    game = Game(SURFACE_SIZE, entity_store, seed=seed, params=params)
+    policy_function = POLICIES[policy]
+    for frame in range(frames):
+        if not game.player.is_alive():
+            break
+        game.step(policy_function(game, frame))
+    return {"seed": seed,
+            "policy": policy,
+            **params,
+            **game.stats,
+            "survival_seconds": game.survival_seconds,
+            "alive": game.player.is_alive()}
+
+def _parse_value(name: str, text: str):
+    # cast to the type of the parameter default
+    if name not in PARAMETERS:
+        raise SystemExit(f"Unknown parameter '{name}', choose from: {', '.join(PARAMETERS)}")
+    value = type(PARAMETERS[name])(text)
+    if value < PARAMETER_MINIMUMS.get(name, value):
+        raise SystemExit(f"Parameter '{name}' must be at least {PARAMETER_MINIMUMS[name]}")
+    return value
+
+def parse_overrides(sets: list[str], sweeps: list[str]) -> list[dict]:
+    """returns every parameter combination from fixed 'name=value' and swept 'name=v1,v2' overrides"""
+    fixed = {}
+    for text in sets:
+        name, value = text.split("=", 1)
+        fixed[name] = _parse_value(name, value)
+    names, values = [], []
+    for text in sweeps:
+        name, value = text.split("=", 1)
+        names.append(name)
+        values.append([_parse_value(name, v) for v in value.split(",")])
+    return [{**fixed, **dict(zip(names, combination))} for combination in product(*values)]
+
+def write_results(results: list[dict], file: str) -> None:
+    """writes results as json or csv depending on the file extension"""
+    with open(file, "w", newline="") as output:
+        if file.endswith(".json"):
+            json.dump(results, output, indent=2)
+        else:
+            writer = csv.DictWriter(output, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+def main() -> None:
+    parser = ArgumentParser(description="run seeded headless games in parallel")
+    parser.add_argument("--games", type=int, default=8, help="amount of seeds per parameter combination")
+    parser.add_argument("--seed", type=int, default=0, help="first random seed")
+    parser.add_argument("--frames", type=int, default=18000, help="maximum frames per game")
+    parser.add_argument("--policy", choices=POLICIES, default="circle", help="bot policy providing inputs")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a parameter for every game")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NAME=V1,V2", help="run every listed value of a parameter")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the cpu count")
+    parser.add_argument("--entity-store", action="store_true", help="use the array-backed entity store")
+    parser.add_argument("--output", help="write results to a .csv or .json file")
+    args = parser.parse_args()
+    jobs = [(seed, params, args.policy, args.frames, args.entity_store)
+            for params in parse_overrides(args.set, args.sweep)
+            for seed in range(args.seed, args.seed + args.games)]
+    start = perf_counter()
+    # each game is independent, so workers share nothing but their job arguments
+    with ProcessPoolExecutor(args.workers) as executor:
+        results = list(executor.map(run_game, *zip(*jobs)))
+    elapsed = perf_counter() - start
+    print(f"Ran {len(jobs)} games in {elapsed:.3f}s ({len(jobs) / elapsed:.2f} games per second)")
+    # summarize every parameter combination
+    for params in parse_overrides(args.set, args.sweep):
+        group = [result for result in results if all(result[name] == value for name, value in params.items())]
+        survival = sum(result["survival_seconds"] for result in group) / len(group)
+        kills = sum(result["kills"] for result in group) / len(group)
+        label = ", ".join(f"{name}={value}" for name, value in params.items()) or "defaults"
+        print(f"{label}: survival {survival:.1f}s, kills {kills:.1f}")
+    if args.output:
+        write_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import json
+import platform
+import random
+import sys
+import pygame as pg
+from argparse import ArgumentParser
+from pygame import Surface
+from pygame.image import load as load_image
+from pygame.math import Vector2
+from pygame.transform import scale as scale_surface
+from timeit import Timer
+from typing import Callable
+from data.constants import BULLET_COLOR
+from data.constants import ENEMY_COLORS
+from data.constants import ENEMY_RADIUS
+from data.draw import Draw
+from data.game_object import Bullet
+from data.game_object import Enemy
+from data.game_object import Player
+from data.game_object import test_collision
+from data.text import create_fonts
+from data.text import create_text_surface
+from data.text import FontType
+
+"""per-component microbenchmarks. run from the repository root with 'python -m benchmarks.micro'"""
+
+ENTITY_COUNTS = [10, 100, 1000]
+SCREEN_SIZES = [(1024, 768), (1920, 1080), (3840, 2160)]
+REPEAT = 5
+
+def _random_pos(spread: float) -> Vector2:
+    return Vector2(random.uniform(-spread, spread), random.uniform(-spread, spread))
+
+def _spread(count: int) -> float:
+    """spread that keeps entity density constant across counts"""
+    return (count ** 0.5) * ENEMY_RADIUS * 2
+
+def _new_draw(anti_aliasing: bool) -> Draw:
+    draw = Draw()
+    draw.camera_offset = Vector2(0)
+    draw.anti_aliasing = anti_aliasing
+    return draw
+
+# benchmark setups, each returns a function running one iteration
+
+def _restore(objects: list, start: list[tuple[Vector2, Vector2]]) -> None:
+    """moves objects back to their (pos, direction) at setup, so every iteration runs the same workload"""
+    for obj, (pos, direction) in zip(objects, start):
+        obj.pos.update(pos)
+        obj.direction.update(direction)
+
+def _snapshot(objects: list) -> list[tuple[Vector2, Vector2]]:
+    return [(obj.pos.copy(), obj.direction.copy()) for obj in objects]
+
+def bench_test_collision(count: int) -> Callable[[], None]:
+    enemies = [Enemy(_random_pos(_spread(count))) for _ in range(count)]
+    others = [Enemy(_random_pos(_spread(count))) for _ in range(count)]
+    # colliding enemies are repositioned and would stop overlapping after the first iteration
+    start = _snapshot(enemies)
+    def run() -> None:
+        _restore(enemies, start)
+        for enemy, other in zip(enemies, others):
+            test_collision(enemy, other)
+    return run
+
+def bench_is_touching(count: int) -> Callable[[], None]:
+    bullets = [Bullet(_random_pos(_spread(count)), Vector2(1, 0)) for _ in range(count)]
+    enemies = [Enemy(_random_pos(_spread(count))) for _ in range(count)]
+    def run() -> None:
+        for bullet, enemy in zip(bullets, enemies):
+            bullet.is_touching(enemy)
+    return run
+
+def bench_enemy_update(count: int) -> Callable[[], None]:
+    player = Player(Vector2(0))
+    enemies = [Enemy(_random_pos(_spread(count)) + Vector2(1000, 0)) for _ in range(count)]
+    # enemies would otherwise close in on the player and collide with it in later iterations
+    start = _snapshot(enemies)
+    def run() -> None:
+        _restore(enemies, start)
+        for enemy in enemies:
+            enemy.update(player)
+    return run
+
+def bench_background(size: tuple[int, int], cache_background: bool) -> Callable[[], None]:
+    surface = Surface(size)
+    tile = scale_surface(load_image("images/tile.png"), (96, 96))
+    draw = _new_draw(False)
+    draw.cache_background = cache_background
+    def run() -> None:
+        draw.camera_offset.x += 1.5
+        draw.camera_offset.y += 0.5
+        draw.background(surface, tile)
+    return run
+
+def bench_circle(count: int, anti_aliasing: bool) -> Callable[[], None]:
+    surface = Surface(SCREEN_SIZES[0])
+    draw = _new_draw(anti_aliasing)
+    centers = [Vector2(random.uniform(0, SCREEN_SIZES[0][0]), random.uniform(0, SCREEN_SIZES[0][1])) for _ in range(count)]
+    colors = [random.choice(ENEMY_COLORS) for _ in range(count)]
+    def run() -> None:
+        for center, color in zip(centers, colors):
+            draw.circle(surface, color, center, ENEMY_RADIUS)
+    return run
+
+def bench_circles(count: int, anti_aliasing: bool) -> Callable[[], None]:
+    surface = Surface(SCREEN_SIZES[0])
+    draw = _new_draw(anti_aliasing)
+    circles = [(random.choice(ENEMY_COLORS), Vector2(random.uniform(0, SCREEN_SIZES[0][0]), random.uniform(0, SCREEN_SIZES[0][1])), ENEMY_RADIUS) for _ in range(count)]
+    def run() -> None:
+        draw.circles(surface, circles)
+    return run
+
+def bench_line_no_offset(count: int, anti_aliasing: bool) -> Callable[[], None]:
+    surface = Surface(SCREEN_SIZES[0])
+    draw = _new_draw(anti_aliasing)
+    starts = [Vector2(random.uniform(0, SCREEN_SIZES[0][0]), random.uniform(0, SCREEN_SIZES[0][1])) for _ in range(count)]
+    directions = [Vector2(1, 0).rotate(random.uniform(0, 360)) for _ in range(count)]
+    def run() -> None:
+        for start, direction in zip(starts, directions):
+            draw.line_no_offset(surface, BULLET_COLOR, start, direction, ENEMY_RADIUS, 2)
+    return run
+
+def bench_create_text_surface(font_type: FontType, anti_aliasing: bool) -> Callable[[], None]:
+    fonts = create_fonts()
+    texts = [f"frames_per_second: {random.uniform(0, 100):.3f}" for _ in range(17)]
+    def run() -> None:
+        for text in texts:
+            create_text_surface(fonts, BULLET_COLOR, font_type, text, anti_aliasing)
+    return run
+
+def cases() -> dict[str, Callable[[], Callable[[], None]]]:
+    """returns benchmark names mapped to their setup"""
+    result = {}
+    for count in ENTITY_COUNTS:
+        result[f"test_collision[{count}]"] = lambda count=count: bench_test_collision(count)
+        result[f"is_touching[{count}]"] = lambda count=count: bench_is_touching(count)
+        result[f"enemy_update[{count}]"] = lambda count=count: bench_enemy_update(count)
+        for anti_aliasing in (False, True):
+            result[f"circle[{count},aa={anti_aliasing}]"] = lambda count=count, anti_aliasing=anti_aliasing: bench_circle(count, anti_aliasing)
+            result[f"circles[{count},aa={anti_aliasing}]"] = lambda count=count, anti_aliasing=anti_aliasing: bench_circles(count, anti_aliasing)
+            result[f"line_no_offset[{count},aa={anti_aliasing}]"] = lambda count=count, anti_aliasing=anti_aliasing: bench_line_no_offset(count, anti_aliasing)
+    for size in SCREEN_SIZES:
+        for cache_background in (False, True):
+            result[f"background[{size[0]}x{size[1]},cached={cache_background}]"] = lambda size=size, cache_background=cache_background: bench_background(size, cache_background)
+    for font_type in FontType:
+        for anti_aliasing in (False, True):
+            result[f"create_text_surface[{font_type.name.lower()},aa={anti_aliasing}]"] = lambda font_type=font_type, anti_aliasing=anti_aliasing: bench_create_text_surface(font_type, anti_aliasing)
+    return result
+
+def measure(run: Callable[[], None]) -> dict[str, float]:
+    """times a benchmark, returns seconds per iteration"""
+    timer = Timer(run)
+    number, _ = timer.autorange()
+    times = [time / number for time in timer.repeat(REPEAT, number)]
+    return {"min": min(times),
+            "mean": sum(times) / len(times),
+            "iterations": number * REPEAT}
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """returns names of benchmarks slower than the baseline by more than threshold"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{name:48} {ratio:6.2f}x  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+def main() -> None:
+    parser = ArgumentParser(description="time hot functions in isolation")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--output", help="write results as json to this file")
+    parser.add_argument("--compare", help="compare against a baseline json file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+    pg.init()
+    random.seed(0)
+    results = {}
+    for name, setup in cases().items():
+        if args.filter in name:
+            results[name] = measure(setup())
+            print(f"{name:48} {results[name]['min'] * 1e6:12.2f} us")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": {"python": platform.python_version(),
+                                "pygame": pg.version.ver,
+                                "platform": platform.platform()},
+                       "results": results}, file, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed")
+            sys.exit(1)
+    pg.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame as pg
+from argparse import ArgumentParser
+from pygame import Surface
+from pygame.math import Vector2
+from time import perf_counter
+from data.constants import FPS
+from data.constants import TICK_SECONDS
+from data.draw import Draw
+from data.game_object import Player
+from data.patterns import Emitter
+from data.patterns import is_available
+from data.patterns import load_patterns
+from data.patterns import ProjectileStore
+
+"""bullet pattern stress scene. run from the repository root with 'python -m benchmarks.patterns'"""
+
+SURFACE_SIZE = (1024, 768)
+EMITTER_DISTANCE = 300
+
+def run_scene(emitters: int, frames: int) -> tuple[int, float]:
+    """runs emitters cycling through every pattern around an invulnerable player.
+    returns the mean live projectiles and mean seconds per frame spent updating and drawing them"""
+    patterns = load_patterns()
+    surface = Surface(SURFACE_SIZE)
+    draw = Draw()
+    draw.camera_offset = -Vector2(SURFACE_SIZE) / 2
+    player = Player(Vector2(0))
+    store = ProjectileStore()
+    carriers = [(Vector2(EMITTER_DISTANCE, 0).rotate(360 * i / emitters), Emitter(patterns[i % len(patterns)])) for i in range(emitters)]
+    total_time, total_count, measured = 0.0, 0, 0
+    for frame in range(frames):
+        # keep the player hit testable without dying
+        player.i_frames = 2
+        start = perf_counter()
+        store.begin_tick()
+        for pos, emitter in carriers:
+            emitter.update(store, pos, player.pos)
+        store.update(player)
+        store.draw(surface, draw)
+        elapsed = perf_counter() - start
+        # measure once the projectile count has settled
+        if frame >= frames // 2:
+            total_time += elapsed
+            total_count += store.count
+            measured += 1
+    return total_count // measured, total_time / measured
+
+def main() -> None:
+    parser = ArgumentParser(description="find how many enemy projectiles fit in the frame budget")
+    parser.add_argument("--frames", type=int, default=int(FPS * 10), help="frames simulated per step of the ramp")
+    parser.add_argument("--budget", type=float, default=TICK_SECONDS * 1000, help="frame budget in milliseconds")
+    args = parser.parse_args()
+    if not is_available() or not load_patterns():
+        print("Bullet patterns need numpy and pattern files")
+        return
+    pg.init()
+    emitters, best = 8, None
+    # double the emitters until the frame budget is exceeded
+    while True:
+        count, seconds = run_scene(emitters, args.frames)
+        print(f"{emitters:6} emitters {count:8} projectiles {seconds * 1000:8.2f} ms per frame")
+        if seconds * 1000 > args.budget:
+            break
+        best = count
+        emitters *= 2
+    print(f"Projectiles within {args.budget:.2f} ms: {best or 0}")
+    pg.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import random
+import sys
+from argparse import ArgumentParser
+from pygame.math import Vector2
+from time import perf_counter
+from data.constants import FPS
+from data.draw import Camera
+from data.game import Game
+from data.game import quantize_inputs
+from data.pipeline import RenderState
+from data.pipeline import SimulationThread
+from data.policy import POLICIES
+
+"""checks that simulating on the simulation thread gives the same games as simulating serially, and times both.
+run from the repository root with 'python -m benchmarks.pipeline'"""
+
+SURFACE_SIZE = Vector2(1024, 768)
+
+def run(entity_store: bool, pipelined: bool, frames: int, seed: int) -> tuple[list[tuple], float]:
+    """runs a game with a varying amount of ticks per frame the way the game loop does.
+    returns (checksum, frame, render state values) of every frame drawn and the seconds taken"""
+    game = Game(SURFACE_SIZE, entity_store, seed=seed)
+    camera = Camera(game.player.pos - SURFACE_SIZE / 2)
+    policy = POLICIES["circle"]
+    # frames simulate a varying amount of ticks, like frames of a varying length do
+    rng = random.Random(seed)
+    simulation = SimulationThread()
+
+    def job(ticks: int, alpha: float) -> tuple[RenderState, int]:
+        events = []
+        game.on_event = lambda kind, value: events.append((kind, value))
+        for _ in range(ticks):
+            game.step(quantize_inputs(policy(game, game.frames)))
+            camera.update(game.player.pos, SURFACE_SIZE)
+        state = RenderState(game, camera, SURFACE_SIZE, alpha, ticks, True)
+        state.events = events
+        return state, game.checksum()
+
+    results = []
+    start = perf_counter()
+    for _ in range(frames):
+        ticks, alpha = rng.choice((0, 1, 1, 1, 2)), rng.random()
+        if pipelined:
+            # the next frame simulates while this one would draw the last result
+            if simulation.busy:
+                results.append(simulation.wait())
+            simulation.submit(lambda ticks=ticks, alpha=alpha: job(ticks, alpha))
+        else:
+            results.append(job(ticks, alpha))
+    if simulation.busy:
+        results.append(simulation.wait())
+    elapsed = perf_counter() - start
+    simulation.close()
+    # arrays of drawn entities are compared as lists
+    return [(checksum, state.ticks, state.alpha, state.camera, state.layers,
+             None if state.entities is None else [value if isinstance(value, list) else value.tolist() for value in state.entities],
+             state.stats, state.events, tuple(state.player_pos))
+            for state, checksum in results], elapsed
+
+def main() -> None:
+    parser = ArgumentParser(description="compare serial and pipelined simulation")
+    parser.add_argument("--frames", type=int, default=int(FPS * 20), help="frames run per game")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    failed = False
+    for entity_store in (False, True):
+        serial, serial_seconds = run(entity_store, False, args.frames, args.seed)
+        pipelined, pipelined_seconds = run(entity_store, True, args.frames, args.seed)
+        mismatch = next((i for i, (a, b) in enumerate(zip(serial, pipelined)) if a != b), None)
+        if len(serial) != len(pipelined) and mismatch is None:
+            mismatch = min(len(serial), len(pipelined))
+        name = "store" if entity_store else "objects"
+        print(f"{name:8} serial {serial_seconds:6.2f} s pipelined {pipelined_seconds:6.2f} s "
+              + ("match" if mismatch is None else f"mismatch at frame {mismatch}"))
+        failed |= mismatch is not None
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import random
+from argparse import ArgumentParser
+from pygame.math import Vector2
+from time import perf_counter
+from data.constants import FPS
+from data.game import Game
+from data.game import quantize_inputs
+from data.policy import POLICIES
+from data.snapshot import restore
+from data.snapshot import RewindBuffer
+from data.snapshot import snapshot
+
+"""world snapshot and rewind costs. run from the repository root with 'python -m benchmarks.snapshot'"""
+
+SURFACE_SIZE = Vector2(1024, 768)
+ENTITY_COUNTS = [100, 1000, 3000]
+# spawning and despawning are off so the entity count holds
+PARAMS = {"enemy_despawn_rate": 1 << 30, "enemy_pattern_every": 0, "enemy_spawn_rate": 1 << 30}
+
+def create_game(count: int, entity_store: bool, seed: int) -> Game:
+    """returns a game with count enemies scattered around the player"""
+    game = Game(SURFACE_SIZE, entity_store, seed=seed, params=PARAMS)
+    rng = random.Random(seed)
+    spread = SURFACE_SIZE.magnitude()
+    for _ in range(count):
+        pos = Vector2(rng.uniform(-spread, spread), rng.uniform(-spread, spread))
+        if game.store is not None:
+            game.store.spawn_enemy(pos)
+        else:
+            enemy = game.enemy_pool.acquire()
+            enemy.reset(pos.x, pos.y)
+            game.obj_enemy.append(enemy)
+    return game
+
+def run(count: int, entity_store: bool, frames: int) -> dict:
+    """records frames of a game with count enemies, returns mean milliseconds and memory use"""
+    game = create_game(count, entity_store, 1)
+    rewind = RewindBuffer()
+    policy = POLICIES["circle"]
+    record_times = []
+    for frame in range(frames):
+        inputs = quantize_inputs(policy(game, frame))
+        game.step(inputs)
+        start = perf_counter()
+        rewind.record(game, inputs)
+        record_times.append(perf_counter() - start)
+    data = snapshot(game)
+    start = perf_counter()
+    for _ in range(10):
+        snapshot(game)
+    snapshot_time = (perf_counter() - start) / 10
+    start = perf_counter()
+    for _ in range(10):
+        restore(game, data)
+    restore_time = (perf_counter() - start) / 10
+    start = perf_counter()
+    rewound = rewind.rewind(game, int(FPS))
+    rewind_time = perf_counter() - start
+    return {"entities": game.enemy_count + game.bullet_count,
+            "snapshot_bytes": len(data),
+            "snapshot_ms": snapshot_time * 1000,
+            "restore_ms": restore_time * 1000,
+            "record_ms": sum(record_times) / frames * 1000,
+            # the slowest records are keyframes and dropped keyframes, a single peak also catches scheduling hitches
+            "record_p99_ms": sorted(record_times)[int(frames * 0.99)] * 1000,
+            "record_peak_ms": max(record_times) * 1000,
+            "rewind_ms": rewind_time * 1000,
+            "rewound": rewound,
+            "kib_per_second": rewind.bytes_per_second / 1024}
+
+def main() -> None:
+    parser = ArgumentParser(description="measure world snapshot and rewind costs")
+    parser.add_argument("--frames", type=int, default=int(FPS * 6), help="frames recorded per run")
+    args = parser.parse_args()
+    for entity_store in (False, True):
+        for count in ENTITY_COUNTS:
+            result = run(count, entity_store, args.frames)
+            print(f"{'store' if entity_store else 'objects':8} {result['entities']:6} entities"
+                  f" snapshot {result['snapshot_ms']:6.3f} ms {result['snapshot_bytes']:8} bytes"
+                  f" restore {result['restore_ms']:6.3f} ms"
+                  f" record mean {result['record_ms']:6.3f} ms p99 {result['record_p99_ms']:6.3f} ms peak {result['record_peak_ms']:6.3f} ms"
+                  f" rewind {result['rewound']} frames {result['rewind_ms']:7.2f} ms"
+                  f" history {result['kib_per_second']:8.1f} KiB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import json
+import platform
+import sys
+import pygame as pg
+from argparse import ArgumentParser
+from pygame import Surface
+from pygame.math import Vector2
+from time import perf_counter
+from data.assets import AssetCache
+from data.constants import DEBUG_LINE_COLOR
+from data.constants import DEBUG_LINE_WIDTH
+from data.constants import ENEMY_SPAWN_RATE
+from data.constants import FPS
+from data.constants import seconds_to_frames
+from data.constants import WEAPON_COOLDOWN_FRAMES
+from data.draw import Camera
+from data.draw import Draw
+from data.game import Game
+from data.pipeline import RenderState
+from data.policy import circle_policy
+
+"""capacity stress test, ramps enemy spawning and bullet fire until the frame rate no longer holds.
+run from the repository root with 'python -m benchmarks.stress'"""
+
+SURFACE_SIZE = Vector2(1024, 768)
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "stress_baseline.json")
+IMAGE_TILE_SCALE = Vector2(96)
+# frame times are judged over windows of consecutive frames
+WINDOW_FRAMES = seconds_to_frames(0.5)
+# windows in a row over budget that end the capacity, fewer are taken as hitches
+SUSTAINED_WINDOWS = 3
+# the first frames load assets and fill pools
+WARMUP_FRAMES = seconds_to_frames(1)
+# the ramp ends once the last second of frames is this far over budget
+STOP_FACTOR = 2.0
+
+def run(entity_store: bool, render: bool, seconds: float, peak: int, seed: int) -> list[tuple[int, float]]:
+    """ramps a game from default spawning to peak enemies and a bullet every frame over seconds of game time.
+    the player cannot die. returns (live entities, frame seconds) of every frame after the warmup"""
+    game = Game(SURFACE_SIZE, entity_store, seed=seed, params={"enemy_despawn_rate": 1 << 30, "weapon_bullets": 1 << 30})
+    surface = pg.display.set_mode(SURFACE_SIZE)
+    assets = AssetCache()
+    draw = Draw()
+    camera = Camera(game.player.pos - SURFACE_SIZE / 2)
+    budget = 1 / FPS
+    frames = seconds_to_frames(seconds)
+    samples = []
+    for frame in range(frames):
+        progress = frame / frames
+        # enemies spawned per frame ramp linearly, spawning every frame once there is more than one
+        spawns = 1 / ENEMY_SPAWN_RATE + (peak - 1 / ENEMY_SPAWN_RATE) * progress
+        game.enemy_spawn_rate = max(1, round(1 / spawns))
+        game.enemy_spawn_count = max(1, round(spawns))
+        game.current_enemy_spawn_time = min(game.current_enemy_spawn_time, game.enemy_spawn_rate)
+        # a cooldown of one frame fires every frame
+        game.weapon_cooldown_frames = max(1, round(WEAPON_COOLDOWN_FRAMES * (1 - progress)))
+        game.weapon_cooldown = min(game.weapon_cooldown, game.weapon_cooldown_frames)
+        inputs = circle_policy(game, frame)
+        inputs.firing = True
+        # keep the player alive and hit testable
+        game.player.i_frames = 2
+        start = perf_counter()
+        game.step(inputs)
+        if render:
+            camera.update(game.player.pos, SURFACE_SIZE)
+            draw_frame(surface, draw, assets, game, RenderState(game, camera, SURFACE_SIZE, 1.0, 1, False))
+        elapsed = perf_counter() - start
+        if frame < WARMUP_FRAMES:
+            continue
+        samples.append((game.enemy_count + game.bullet_count + game.projectile_count, elapsed))
+        # stop once clearly past capacity
+        recent = sorted(seconds for _, seconds in samples[-int(FPS):])
+        if len(recent) == int(FPS) and recent[int(len(recent) * 0.05)] > budget * STOP_FACTOR:
+            break
+    return samples
+
+def draw_frame(surface: Surface, draw: Draw, assets: AssetCache, game: Game, state: RenderState) -> None:
+    """draws the world from a render state the way the game does"""
+    draw.interpolate(state.alpha, state.camera)
+    draw.background(surface, assets.image("tile", IMAGE_TILE_SCALE))
+    for circles, lines in state.layers:
+        draw.circles(surface, circles)
+        for pos, direction, length in lines:
+            draw.line(surface, DEBUG_LINE_COLOR, pos, direction, length, DEBUG_LINE_WIDTH)
+    if state.entities is not None:
+        game.store.draw_visible(surface, draw, *state.entities)
+    if state.projectiles is not None:
+        game.projectiles.draw_visible(surface, draw, *state.projectiles)
+
+def window_stats(samples: list[tuple[int, float]]) -> list[tuple[int, int, float, float]]:
+    """returns (lowest entities, highest entities, mean, p95) in milliseconds for consecutive windows of frames"""
+    result = []
+    for i in range(0, len(samples) - WINDOW_FRAMES + 1, WINDOW_FRAMES):
+        window = samples[i:i + WINDOW_FRAMES]
+        counts = [count for count, _ in window]
+        times = sorted(seconds for _, seconds in window)
+        result.append((min(counts), max(counts), sum(times) / len(times) * 1000, times[int(len(times) * 0.95)] * 1000))
+    return result
+
+def capacity(windows: list[tuple[int, int, float, float]], budget: float) -> tuple[int, bool]:
+    """returns the highest entity count held within the budget at p95 before the budget is exceeded for
+    SUSTAINED_WINDOWS windows in a row, and if that happened at all"""
+    held = 0
+    for i, (_, highest, _, p95) in enumerate(windows):
+        if p95 > budget:
+            if all(window[3] > budget for window in windows[i:i + SUSTAINED_WINDOWS]):
+                return held, True
+            continue
+        held = max(held, highest)
+    return held, False
+
+def main() -> None:
+    parser = ArgumentParser(description="find the live entity count that still holds the frame rate at p95")
+    parser.add_argument("--seconds", type=float, default=120, help="game seconds the ramp takes at most")
+    parser.add_argument("--peak", type=int, default=4, help="enemies spawned per frame at the end of the ramp")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--entity-store", action="store_true", help="use the array-backed entity store")
+    parser.add_argument("--no-render", action="store_true", help="only time the simulation")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline json file compared against")
+    parser.add_argument("--update-baseline", action="store_true", help="write the result to the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed capacity loss against the baseline")
+    args = parser.parse_args()
+    pg.init()
+    # results are only comparable between runs of the same ramp
+    name = (f"{'store' if args.entity_store else 'objects'}_{'simulation' if args.no_render else 'render'}"
+            f"_{args.seconds:g}s_peak{args.peak}_seed{args.seed}")
+    environment = {"python": platform.python_version(), "pygame": pg.version.ver, "platform": platform.platform()}
+    budget = 1000 / FPS
+    windows = window_stats(run(args.entity_store, not args.no_render, args.seconds, args.peak, args.seed))
+    for lowest, highest, mean, p95 in windows:
+        print(f"{lowest:6}-{highest:<6} entities mean {mean:7.2f} ms p95 {p95:7.2f} ms")
+    result, exceeded = capacity(windows, budget)
+    print(f"{name}: {result} entities at {FPS:g} fps p95 ({budget:.2f} ms)" + ("" if exceeded else ", budget never exceeded"))
+    pg.quit()
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {"meta": {}, "results": {}}
+    if args.update_baseline:
+        baseline["meta"][name] = environment
+        baseline["results"][name] = result
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+    expected = baseline["results"].get(name)
+    if expected is None:
+        print(f"No baseline for {name}, record one with --update-baseline")
+        return
+    for key, value in baseline["meta"].get(name, {}).items():
+        if environment.get(key) != value:
+            print(f"Warning: baseline was recorded with {key} {value}, this run uses {environment.get(key)}")
+    ratio = result / expected if expected else 1.0
+    print(f"{name}: {ratio:.2f}x baseline of {expected} entities")
+    if ratio < 1 - args.threshold:
+        print("Capacity regressed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import hashlib
+import os
+from pygame import Surface
+from pygame.image import frombytes as image_from_bytes
+from pygame.image import load as load_image
+from pygame.image import tobytes as image_to_bytes
+from pygame.transform import scale as scale_surface
+from .constants import ASSET_CACHE_DIRECTORY
+from .constants import IMAGE_DIRECTORY
+
+""" lazily loaded images with a preprocessed on-disk cache """
+
+class AssetCache:
+    """loads scaled images on first use. scaled pixels are stored on disk keyed by source hash and scale,
+    so later runs skip decoding and scaling"""
+
+    def __init__(self, image_directory: str = IMAGE_DIRECTORY, cache_directory: str = ASSET_CACHE_DIRECTORY):
+        self.image_directory = image_directory
+        self.cache_directory = cache_directory
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._images: dict[tuple[str, tuple[int, int]], Surface] = {}
+
+    def image(self, name: str, scale: tuple[float, float]) -> Surface:
+        """returns the named image scaled and converted for the display, loading it if needed"""
+        size = (int(scale[0]), int(scale[1]))
+        key = (name, size)
+        image = self._images.get(key)
+        if image is None:
+            image = self._images[key] = self._load(name, size).convert_alpha()
+        return image
+
+    def clear(self) -> None:
+        """forgets loaded images, they are reloaded on next use"""
+        self._images.clear()
+
+    def _load(self, name: str, size: tuple[int, int]) -> Surface:
+        with open(os.path.join(self.image_directory, f"{name}.png"), "rb") as file:
+            source = file.read()
+        digest = hashlib.sha1(source).hexdigest()[:16]
+        cache_file = os.path.join(self.cache_directory, f"{name}_{digest}_{size[0]}x{size[1]}.rgba")
+        try:
+            with open(cache_file, "rb") as file:
+                image = image_from_bytes(file.read(), size, "RGBA")
+            self.disk_hits += 1
+            return image
+        except (OSError, ValueError):
+            pass
+        # decode and scale the source, then store the raw pixels for next time
+        self.disk_misses += 1
+        image = scale_surface(load_image(os.path.join(self.image_directory, f"{name}.png")), size)
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            with open(cache_file, "wb") as file:
+                file.write(image_to_bytes(image, "RGBA"))
+        except OSError as error:
+            print(f"Could not cache asset '{name}': {error}")
+        return image
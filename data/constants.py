@@ -16,9 +16,9 @@ def make_framerate_independent(value: float) -> float:
     """returns the value in frames per second"""
     return value / FPS
 
-def random_vector() -> Vector2:
-    """returns a unit vector with a random direction"""
-    random_angle = random.uniform(0, 2 * pi)
+def random_vector(rng: random.Random) -> Vector2:
+    """returns a unit vector with a random direction, drawn from rng"""
+    random_angle = rng.uniform(0, 2 * pi)
     return Vector2(cos(random_angle), sin(random_angle))
 
 def create_font(size: int) -> Font:
@@ -28,6 +28,11 @@ def create_font(size: int) -> Font:
 # window properties
 TITLE = "Python Game"
 FPS = 65.0
+IDLE_FPS = 10
+
+# simulation, ticks run at FPS independent of the render rate
+TICK_SECONDS = 1 / FPS
+MAX_CATCH_UP_TICKS = 5
 
 # camera
 _CAMERA_SPEED = 0.05  # [0.0 - 1.0]
@@ -49,6 +54,10 @@ UI_WEAPON_WIDTH = 10
 # font file
 FONT_FILE = "data/upheavtt.ttf"
 
+# asset files
+IMAGE_DIRECTORY = "images"
+ASSET_CACHE_DIRECTORY = "cache/assets"
+
 # colors
 AIM_LINE_COLOR = Color(255, 255, 255)
 BULLET_COLOR = Color(0, 128, 255)
@@ -77,5 +86,41 @@ ENEMY_LIFE = len(ENEMY_COLORS)
 ENEMY_RADIUS = 24
 ENEMY_DESPAWN_RATE = seconds_to_frames(15)
 ENEMY_SPAWN_RATE = seconds_to_frames(1.25)
+# enemies spawned at once every spawn
+ENEMY_SPAWN_COUNT = 1
 ENEMY_SPEED = 150.0
 ENEMY_TRACKING = make_framerate_independent(1.5)
+# enemies farther than this fraction of the screen diagonal update every few frames
+ENEMY_LOD_DISTANCE_SCALE = 0.6
+ENEMY_LOD_INTERVAL = 4
+# every nth spawned enemy carries a bullet pattern. patterns need numpy, so they are opt-in and 0 disables them
+ENEMY_PATTERN_EVERY = 0
+
+# bullet patterns
+PATTERN_DIRECTORY = "data/patterns"
+
+# weapon
+WEAPON_BULLETS = 10
+WEAPON_COOLDOWN_FRAMES = seconds_to_frames(0.2)
+WEAPON_DAMAGE = 1
+WEAPON_RELOAD_FRAMES = seconds_to_frames(1)
+
+# flight recorder, frames slower than the budget in ticks dump the last seconds of frame records
+FLIGHT_RECORDER_BUDGET = 2.0
+FLIGHT_RECORDER_SECONDS = 10
+
+# quality governor, frames over the budget in ticks lower quality a stage at a time,
+# it is restored once frames take less than the headroom fraction of the budget for longer
+GOVERNOR_BUDGET = 1.0
+GOVERNOR_DEGRADE_SECONDS = 0.5
+GOVERNOR_RESTORE_SECONDS = 3
+GOVERNOR_HEADROOM = 0.6
+# distant enemies update this many times less often at the lowest stage
+GOVERNOR_LOD_FACTOR = 2
+
+# rewind, world snapshots kept every frame with a full keyframe every interval
+REWIND_KEYFRAME_SECONDS = 0.25
+REWIND_SECONDS = 5
+
+# collision
+COLLISION_CELL_SIZE = ENEMY_RADIUS * 2
@@ -2,7 +2,9 @@ from math import atan2
 from math import cos
 from math import sin
 from pygame import Color
+from pygame import RLEACCEL
 from pygame import Surface
+from pygame import SRCALPHA
 from pygame import Vector2
 from pygame.draw import circle as draw_circle
 from pygame.draw import line as draw_line
@@ -10,28 +12,93 @@ from pygame.gfxdraw import aacircle as draw_aa_circle
 from pygame.gfxdraw import aapolygon as draw_aa_polygon
 from pygame.gfxdraw import filled_circle as draw_filled_circle
 from pygame.gfxdraw import filled_polygon as draw_filled_polygon
+from pygame.transform import average_color
+from typing import Iterable
 from typing import Sequence
 from .constants import CAMERA_SPEED
 from .constants import DEBUG_LINE_WIDTH
 
+class Camera:
+    """camera offsets of the last two simulation ticks. it is advanced with the simulation,
+    so in pipeline mode only the simulation thread touches it while a job runs"""
+
+    def __init__(self, offset: Vector2 = Vector2(0)):
+        self._tick_offset = offset.copy()
+        self._last_tick_offset = offset.copy()
+
+    def update(self, pos: Vector2, view_size: Vector2) -> None:
+        """lerps the camera offset towards centering pos in a view of view_size world units, called once per simulation tick"""
+        self._last_tick_offset = self._tick_offset
+        self._tick_offset = self._tick_offset.lerp(pos - view_size / 2, CAMERA_SPEED)
+
+    def ticks(self) -> tuple[Vector2, Vector2]:
+        """returns copies of the camera offsets of the last two ticks"""
+        return self._last_tick_offset.copy(), self._tick_offset.copy()
+
+    def reset(self, offset: Vector2) -> None:
+        """moves the camera to the offset without interpolation"""
+        self._tick_offset = offset.copy()
+        self._last_tick_offset = offset.copy()
+
 class Draw:
     """draw functions"""
 
     def __init__(self):
+        # camera offset used when drawing, interpolated between the last two camera ticks
         self.camera_offset = None
         self.anti_aliasing = False
+        self.cache_background = True
+        # fill the background with the average tile color instead of drawing tiles
+        self.flat_background = False
+        # surface pixels per world unit, below 1 the world is drawn to a smaller surface and scaled up
+        self.scale = 1.0
         self._blit_info = []
+        self._background: Surface = None
+        self._flat_color: Color = None
+        self._sprites: dict[tuple[int, tuple[int, int, int, int], bool], Surface] = {}
+
+    def interpolate(self, alpha: float, ticks: tuple[Vector2, Vector2]) -> None:
+        """sets the drawing camera offset between the (last, current) tick offsets of a camera"""
+        last, current = ticks
+        self.camera_offset = last.lerp(current, alpha)
 
-    def update(self, surface: Surface, pos: Vector2, anti_aliasing: bool) -> None:
-        """updates the draw object"""
-        self.anti_aliasing = anti_aliasing
-        # lerp camera offset towards player position
-        self.camera_offset = self.camera_offset.lerp(pos - (Vector2(surface.get_size()) / 2), CAMERA_SPEED)
+    def view(self, surface: Surface) -> tuple[float, float, float, float]:
+        """returns the (left, top, right, bottom) world area shown on the surface"""
+        left, top = self.camera_offset
+        return left, top, left + surface.get_width() / self.scale, top + surface.get_height() / self.scale
+
+    def reset_camera(self, offset: Vector2) -> None:
+        """moves the drawing camera offset to the offset"""
+        self.camera_offset = offset.copy()
 
     def background(self, surface: Surface, tile: Surface) -> int:
-        """draws background, returns amount of tiles drawn"""
-        start_x = int(-self.camera_offset.x % tile.get_width()) - tile.get_width()
-        pos = Vector2(start_x, int(-self.camera_offset.y % tile.get_height() - tile.get_height()))
+        """draws background, returns amount of blits"""
+        if self.flat_background:
+            if self._flat_color is None:
+                self._flat_color = Color(average_color(tile))
+            surface.fill(self._flat_color)
+            return 0
+        if not self.cache_background:
+            return self.background_tiles(surface, tile)
+        # pre-compose tiles once per window size, one tile larger than the surface
+        if self._background is None:
+            size = (surface.get_width() + tile.get_width(), surface.get_height() + tile.get_height())
+            self._background = Surface(size, 0, surface)
+            self._background.blits([(tile, (x, y)) for x in range(0, size[0], tile.get_width()) for y in range(0, size[1], tile.get_height())], doreturn=False)
+        offset = self.camera_offset * self.scale
+        surface.blit(self._background, (int(-offset.x % tile.get_width()) - tile.get_width(), int(-offset.y % tile.get_height() - tile.get_height())))
+        return 1
+
+    def invalidate_background(self) -> None:
+        """discards the pre-composed background, used when the window size changes"""
+        self._background = None
+        self._flat_color = None
+
+    def background_tiles(self, surface: Surface, tile: Surface) -> int:
+        """draws background tile by tile, returns amount of tiles drawn"""
+        offset = self.camera_offset * self.scale
+        start_x = int(-offset.x % tile.get_width()) - tile.get_width()
+        pos = Vector2(start_x, int(-offset.y % tile.get_height() - tile.get_height()))
         self._blit_info.clear()
         while pos.y < surface.get_height():
             while pos.x < surface.get_width():
@@ -44,15 +111,45 @@ class Draw:
 
     def circle(self, surface: Surface, color: Color, center: Vector2, radius: float) -> None:
         """draws a circle"""
-        center = center - self.camera_offset
-        if self.anti_aliasing:
-            _aa_circle(surface, int(center.x), int(center.y), int(radius), color)
-        else:
-            draw_circle(surface, color, center, radius)
+        scale = self.scale
+        radius = int(radius * scale)
+        surface.blit(self.circle_sprite(color, radius), (int((center.x - self.camera_offset.x) * scale) - radius, int((center.y - self.camera_offset.y) * scale) - radius))
+
+    def circles(self, surface: Surface, circles: Iterable[tuple[Color, Vector2, float]]) -> int:
+        """draws (color, center, radius) circles with a single blits call, returns amount drawn"""
+        offset_x, offset_y = self.camera_offset
+        scale = self.scale
+        self._blit_info.clear()
+        for color, center, radius in circles:
+            radius = int(radius * scale)
+            self._blit_info.append((self.circle_sprite(color, radius), (int((center[0] - offset_x) * scale) - radius, int((center[1] - offset_y) * scale) - radius)))
+        surface.blits(self._blit_info, doreturn=False)
+        return len(self._blit_info)
+
+    def circle_sprite(self, color: Color, radius: int) -> Surface:
+        """returns a cached pre-rendered circle, rendering it on first use"""
+        key = (radius, tuple(color), self.anti_aliasing)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            size = radius * 2 + 1
+            if self.anti_aliasing:
+                sprite = Surface((size, size), SRCALPHA)
+                _aa_circle(sprite, radius, radius, radius, color)
+                # run-length encoded alpha blits several times faster than plain per-pixel alpha
+                sprite.set_alpha(255, RLEACCEL)
+            else:
+                # solid sprite with a colorkey blits faster than per-pixel alpha
+                sprite = Surface((size, size))
+                key_color = (0, 0, 0) if tuple(color)[:3] != (0, 0, 0) else (255, 255, 255)
+                sprite.fill(key_color)
+                sprite.set_colorkey(key_color, RLEACCEL)
+                draw_circle(sprite, color, (radius, radius), radius)
+            self._sprites[key] = sprite
+        return sprite
 
     def line(self, surface: Surface, color: Color, start: Vector2, direction: Vector2, length: float, width: float) -> None:
         """draws a line"""
-        self.line_no_offset(surface, color, start - self.camera_offset, direction, length, width)
+        self.line_no_offset(surface, color, (start - self.camera_offset) * self.scale, direction, length * self.scale, max(1, round(width * self.scale)))
 
     def line_no_offset(self, surface: Surface, color: Color, start: Vector2, direction: Vector2, length: float, width: float) -> None:
         """draws a line without using camera offset"""
@@ -0,0 +1,421 @@
+from pygame import Surface
+from pygame import Vector2
+from .constants import BULLET_COLOR
+from .constants import BULLET_LIFE
+from .constants import BULLET_RADIUS
+from .constants import BULLET_SPEED
+from .constants import COLLISION_CELL_SIZE
+from .constants import DEBUG_LINE_COLOR
+from .constants import DEBUG_LINE_WIDTH
+from .constants import ENEMY_COLORS
+from .constants import ENEMY_LIFE
+from .constants import ENEMY_RADIUS
+from .constants import ENEMY_SPEED
+from .constants import ENEMY_TRACKING
+from .constants import make_framerate_independent
+from .draw import Draw
+from .game_object import Player
+
+# numpy is optional, the entity store is unavailable without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+""" array-backed entity storage """
+
+# cell keys pack two cell coordinates into one int64
+_KEY_OFFSET = 1 << 20
+_KEY_SHIFT = 21
+# grids with more cells than this fall back to sorted cell keys
+_DENSE_GRID_LIMIT = 1 << 20
+_NEIGHBOR_OFFSETS = [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1)]
+# the own cell and half of the neighbors, so each pair of adjacent cells is visited once
+_HALF_NEIGHBOR_OFFSETS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+# colors visible entities are drawn with, enemy colors by life lost followed by the bullet color
+_PALETTE = ENEMY_COLORS + [BULLET_COLOR]
+
+def is_available() -> bool:
+    """returns if numpy is installed and the entity store can be used"""
+    return np is not None
+
+def _cell_keys(cells: 'np.ndarray') -> 'np.ndarray':
+    return ((cells[:, 0] + _KEY_OFFSET) << _KEY_SHIFT) + (cells[:, 1] + _KEY_OFFSET)
+
+def grid_pairs(pos_a: 'np.ndarray', pos_b: 'np.ndarray', cell_size: float, distinct: bool = False) -> tuple['np.ndarray', 'np.ndarray']:
+    """returns index arrays of candidate pairs (a, b) whose cells are adjacent.
+    cell_size must be at least the largest distance that counts as touching.
+    distinct is for pos_a and pos_b being the same points, every pair of two different points is then returned once"""
+    if len(pos_a) == 0 or len(pos_b) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    cells_a = np.floor(pos_a / cell_size).astype(np.int64)
+    cells_b = np.floor(pos_b / cell_size).astype(np.int64)
+    offsets = np.array(_HALF_NEIGHBOR_OFFSETS if distinct else _NEIGHBOR_OFFSETS)
+    # one border cell around a and b, so every neighbor of a cell of a is inside the grid
+    low = np.minimum(cells_a.min(axis=0), cells_b.min(axis=0)) - 1
+    size = np.maximum(cells_a.max(axis=0), cells_b.max(axis=0)) + 2 - low
+    if size[0] * size[1] <= _DENSE_GRID_LIMIT:
+        # dense grid, neighbor cells are a fixed step away in the flattened grid
+        grid_b = (cells_b[:, 0] - low[0]) * size[1] + (cells_b[:, 1] - low[1])
+        order = np.argsort(grid_b, kind="stable")
+        counts = np.bincount(grid_b, minlength=size[0] * size[1])
+        starts = np.cumsum(counts) - counts
+        grid_a = (cells_a[:, 0] - low[0]) * size[1] + (cells_a[:, 1] - low[1])
+        location = (grid_a[None, :] + (offsets[:, 0] * size[1] + offsets[:, 1])[:, None]).reshape(-1)
+        location_count = np.take(counts, location)
+    else:
+        # sparse grid, sort b by cell key so each cell is a contiguous run
+        keys_b = _cell_keys(cells_b)
+        order = np.argsort(keys_b, kind="stable")
+        unique_keys, starts, counts = np.unique(keys_b[order], return_index=True, return_counts=True)
+        query = _cell_keys((cells_a[None, :, :] + offsets[:, None, :]).reshape(-1, 2))
+        location = np.minimum(np.searchsorted(unique_keys, query), len(unique_keys) - 1)
+        location_count = np.where(unique_keys[location] == query, counts[location], 0)
+    # expand every (a, neighbor cell) query into one pair per b in the cell
+    count_a = len(pos_a)
+    query = np.flatnonzero(location_count)
+    location_count = np.take(location_count, query)
+    total = location_count.sum()
+    # each pair indexes order at the start of its cell plus its position within the cell
+    first = np.cumsum(location_count) - location_count
+    index_a = np.repeat(query % count_a, location_count)
+    index_b = np.take(order, np.arange(total) + np.repeat(np.take(starts, np.take(location, query)) - first, location_count))
+    if distinct:
+        # the own cell, the first count_a queries, holds every pair both ways and each point with itself
+        keep = np.flatnonzero((index_a < index_b) | (np.arange(total) >= location_count[query < count_a].sum()))
+        return np.take(index_a, keep), np.take(index_b, keep)
+    return index_a, index_b
+
+def near_cells(pos: 'np.ndarray', point: tuple[float, float], cell_size: float) -> 'np.ndarray':
+    """returns indices of positions in the cells adjacent to the cell of point, the grid query of a single point.
+    cell_size must be at least the largest distance that counts as touching"""
+    # a linear pass, with one query comparing cells is cheaper than sorting every position into a grid
+    cells = np.floor(pos / cell_size) - np.floor(np.array(point) / cell_size)
+    return np.nonzero((np.abs(cells[:, 0]) <= 1) & (np.abs(cells[:, 1]) <= 1))[0]
+
+def touching_pairs(pos_a: 'np.ndarray', radius_a: 'np.ndarray', pos_b: 'np.ndarray', radius_b: 'np.ndarray', cell_size: float,
+                   distinct: bool = False) -> tuple['np.ndarray', 'np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """returns touching pairs (a, b) with their offset vectors (a - b) and distances, distinct as in grid_pairs"""
+    index_a, index_b = grid_pairs(pos_a, pos_b, cell_size, distinct)
+    # np.take gathers faster than fancy indexing, and square roots are only taken of touching pairs
+    offset = np.take(pos_a, index_a, axis=0) - np.take(pos_b, index_b, axis=0)
+    squared = np.einsum("ij,ij->i", offset, offset)
+    reach = np.take(radius_a, index_a) + np.take(radius_b, index_b)
+    touching = np.flatnonzero(squared < reach * reach)
+    return np.take(index_a, touching), np.take(index_b, touching), np.take(offset, touching, axis=0), np.sqrt(np.take(squared, touching))
+
+def swept_hits(start_a: 'np.ndarray', end_a: 'np.ndarray', radius_a: 'np.ndarray', pos_b: 'np.ndarray', radius_b: 'np.ndarray', cell_size: float) -> tuple['np.ndarray', 'np.ndarray']:
+    """returns pairs (a, b) where a moving from start to end touches b, keeping only the earliest b of each a.
+    cell_size must be at least the largest distance that counts as touching"""
+    travel = end_a - start_a
+    # broad phase around the middle of each path, grown by the longest half path
+    half_length = np.hypot(travel[:, 0], travel[:, 1]) / 2
+    reach = half_length.max() if len(half_length) > 0 else 0.0
+    index_a, index_b = grid_pairs(start_a + travel / 2, pos_b, cell_size + reach)
+    # solve |start + t * travel - b| = radius for the earliest t of every pair
+    d = travel[index_a]
+    f = start_a[index_a] - pos_b[index_b]
+    radius = radius_a[index_a] + radius_b[index_b]
+    a = np.einsum("ij,ij->i", d, d)
+    b = 2 * np.einsum("ij,ij->i", f, d)
+    c = np.einsum("ij,ij->i", f, f) - radius * radius
+    discriminant = b * b - 4 * a * c
+    moving = (a != 0) & (discriminant > 0)
+    t = np.full(len(index_a), np.inf)
+    t[moving] = (-b[moving] - np.sqrt(discriminant[moving])) / (2 * a[moving])
+    # already touching at the start
+    t[c < 0] = 0.0
+    hit = (t >= 0.0) & (t <= 1.0)
+    index_a, index_b, t = index_a[hit], index_b[hit], t[hit]
+    # ties go to the lowest b, matching the object path
+    order = np.lexsort((index_b, t, index_a))
+    _, first = np.unique(index_a[order], return_index=True)
+    return index_a[order[first]], index_b[order[first]]
+
+class EntityArrays:
+    """contiguous arrays of positions, directions, life and radius"""
+
+    # arrays resized and compacted together, subclasses may add more
+    _ARRAYS = ("_pos", "_last_pos", "_direction", "_life", "_radius")
+
+    def __init__(self, capacity: int = 256):
+        self.count = 0
+        self._pos = np.zeros((capacity, 2))
+        self._last_pos = np.zeros((capacity, 2))
+        self._direction = np.zeros((capacity, 2))
+        self._life = np.zeros(capacity, dtype=np.int32)
+        self._radius = np.zeros(capacity)
+
+    @property
+    def pos(self) -> 'np.ndarray':
+        return self._pos[:self.count]
+
+    @property
+    def last_pos(self) -> 'np.ndarray':
+        return self._last_pos[:self.count]
+
+    @property
+    def direction(self) -> 'np.ndarray':
+        return self._direction[:self.count]
+
+    @property
+    def life(self) -> 'np.ndarray':
+        return self._life[:self.count]
+
+    @property
+    def radius(self) -> 'np.ndarray':
+        return self._radius[:self.count]
+
+    def add(self, pos: Vector2, direction: Vector2, life: int, radius: float) -> None:
+        """appends an entity, growing the arrays when full"""
+        if self.count == len(self._life):
+            self._grow()
+        i = self.count
+        self._pos[i] = pos
+        self._last_pos[i] = pos
+        self._direction[i] = direction
+        self._life[i] = life
+        self._radius[i] = radius
+        self.count += 1
+
+    def extend(self, pos: 'np.ndarray', direction: 'np.ndarray', life: int, radius: float) -> int:
+        """appends many entities at once, returns the index of the first"""
+        start, end = self.count, self.count + len(pos)
+        while end > len(self._life):
+            self._grow()
+        self._pos[start:end] = pos
+        self._last_pos[start:end] = pos
+        self._direction[start:end] = direction
+        self._life[start:end] = life
+        self._radius[start:end] = radius
+        self.count = end
+        return start
+
+    def compact(self, keep: 'np.ndarray') -> int:
+        """keeps only the masked entities, returns amount removed"""
+        remaining = int(np.count_nonzero(keep))
+        if remaining != self.count:
+            for name in self._ARRAYS:
+                array = getattr(self, name)
+                array[:remaining] = array[:self.count][keep]
+        removed = self.count - remaining
+        self.count = remaining
+        return removed
+
+    def clear(self) -> None:
+        """removes all entities"""
+        self.count = 0
+
+    def to_bytes(self) -> bytes:
+        """returns every array of the entities as raw bytes, object arrays are left out"""
+        return b"".join(getattr(self, name)[:self.count].tobytes() for name in self._ARRAYS if getattr(self, name).dtype != object)
+
+    def load_bytes(self, data: bytes, count: int, offset: int = 0) -> int:
+        """replaces the entities with count entities read from data at offset, returns the offset after them.
+        object arrays are set to None"""
+        while count > len(self._life):
+            self._grow()
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            if array.dtype == object:
+                array[:count] = None
+                continue
+            values = np.frombuffer(data, array.dtype, count * int(np.prod(array.shape[1:])), offset)
+            array[:count] = values.reshape((count,) + array.shape[1:])
+            offset += values.nbytes
+        self.count = count
+        return offset
+
+    def _grow(self) -> None:
+        capacity = len(self._life) * 2
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            grown = np.full((capacity,) + array.shape[1:], None if array.dtype == object else 0, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+
+class EnemyArrays(EntityArrays):
+    """entity arrays with the reduced rate update phase of each enemy, the frame it last moved at
+    and the bullet pattern emitter it carries, if any"""
+
+    _ARRAYS = EntityArrays._ARRAYS + ("_lod_phase", "_lod_frame", "_emitter")
+
+    def __init__(self, capacity: int = 256):
+        super().__init__(capacity)
+        self._lod_phase = np.zeros(capacity, dtype=np.int64)
+        self._lod_frame = np.zeros(capacity, dtype=np.int64)
+        self._emitter = np.full(capacity, None, dtype=object)
+
+    @property
+    def lod_phase(self) -> 'np.ndarray':
+        return self._lod_phase[:self.count]
+
+    @property
+    def lod_frame(self) -> 'np.ndarray':
+        return self._lod_frame[:self.count]
+
+    @property
+    def emitter(self) -> 'np.ndarray':
+        return self._emitter[:self.count]
+
+class EntityStore:
+    """bullets and enemies held in arrays and updated with batched vector operations"""
+
+    def __init__(self):
+        self.enemy_speed = ENEMY_SPEED
+        self.bullets = EntityArrays()
+        self.enemies = EnemyArrays()
+
+    def begin_tick(self) -> None:
+        """stores current positions for interpolation"""
+        for arrays in (self.bullets, self.enemies):
+            arrays.last_pos[:] = arrays.pos
+
+    def spawn_bullet(self, pos: Vector2, direction: Vector2) -> None:
+        """adds a bullet travelling in the given direction"""
+        self.bullets.add(pos, direction, BULLET_LIFE, BULLET_RADIUS)
+
+    def spawn_enemy(self, pos: Vector2, lod_phase: int = 0, frame: int = 0, emitter: object = None) -> None:
+        """adds an enemy at the position, first moving in frame and carrying the bullet pattern emitter if given"""
+        self.enemies.add(pos, (0, 0), ENEMY_LIFE, ENEMY_RADIUS)
+        self.enemies.lod_phase[-1] = lod_phase
+        self.enemies.lod_frame[-1] = frame - 1
+        self.enemies.emitter[-1] = emitter
+
+    def update_bullets(self, damage: int) -> int:
+        """moves bullets, ticks their life and damages touched enemies. returns hits"""
+        bullets, enemies = self.bullets, self.enemies
+        bullets.life[:] -= 1
+        bullets.pos[:] += bullets.direction * make_framerate_independent(BULLET_SPEED)
+        # positions at the start of the tick are in last_pos, each bullet hits the first enemy along its path
+        index_b, index_e = swept_hits(bullets.last_pos, bullets.pos, bullets.radius, enemies.pos, enemies.radius, COLLISION_CELL_SIZE)
+        bullets.life[index_b] = 0
+        np.subtract.at(enemies.life, index_e, damage)
+        return len(index_b)
+
+    def remove_dead(self) -> int:
+        """compacts out dead bullets and enemies. returns amount of enemies removed"""
+        self.bullets.compact(self.bullets.life > 0)
+        return self.enemies.compact(self.enemies.life > 0)
+
+    def update_enemies(self, player: Player, frame: int, lod_interval: int = 1, lod_distance: float = 0.0) -> int:
+        """moves enemies towards the player, then resolves player and enemy overlap.
+        with a lod interval above 1, enemies farther than lod_distance only move on their phase of the interval,
+        catching up the frames since they last moved, and skip separation. returns the amount of distant enemies"""
+        enemies = self.enemies
+        if enemies.count == 0:
+            return 0
+        player_pos = np.array(player.pos)
+        # every enemy moves and separates unless some are distant
+        moving = near = slice(None)
+        distant = 0
+        if lod_interval > 1:
+            offset = enemies.pos - player_pos
+            far = np.hypot(offset[:, 0], offset[:, 1]) > lod_distance
+            distant = int(np.count_nonzero(far))
+            if distant > 0:
+                # phases of enemies spawned with a longer interval wrap around
+                moving = np.nonzero(~far | (enemies.lod_phase % lod_interval == frame % lod_interval))[0]
+                near = np.nonzero(~far)[0]
+        pos, direction, radius = enemies.pos[moving], enemies.direction[moving], enemies.radius[moving]
+        steps = frame - enemies.lod_frame[moving]
+        enemies.lod_frame[moving] = frame
+        # lerp direction towards player, tracking compounds over the frames covered
+        target = player_pos - pos
+        length = np.hypot(target[:, 0], target[:, 1])[:, None]
+        target = np.divide(target, length, out=np.zeros_like(target), where=length != 0)
+        speed = make_framerate_independent(self.enemy_speed)
+        if (steps == 1).all():
+            direction += (target - direction) * ENEMY_TRACKING
+            pos += direction * speed
+        else:
+            tracking = np.where(steps == 1, ENEMY_TRACKING, 1 - (1 - ENEMY_TRACKING) ** steps)
+            direction += (target - direction) * tracking[:, None]
+            pos += direction * (speed * steps)[:, None]
+        # push enemies out of the player
+        offset = pos - player_pos
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+        touching = (distance < radius + player.radius) & (distance != 0)
+        if touching.any():
+            pos[touching] = player_pos + offset[touching] / distance[touching, None] * (radius[touching, None] + player.radius)
+            player.damage()
+        # fancy indexing copies, slices are already views
+        enemies.pos[moving] = pos
+        enemies.direction[moving] = direction
+        # separate overlapping enemies, each side moves half the overlap
+        pos, radius = enemies.pos[near], enemies.radius[near]
+        index_a, index_b, offset, distance = touching_pairs(pos, radius, pos, radius, COLLISION_CELL_SIZE, distinct=True)
+        separate = distance != 0
+        if not separate.all():
+            index_a, index_b, offset, distance = index_a[separate], index_b[separate], offset[separate], distance[separate]
+        push = offset * ((np.take(radius, index_a) + np.take(radius, index_b) - distance) / (2 * distance))[:, None]
+        for axis in range(2):
+            pos[:, axis] += np.bincount(index_a, push[:, axis], len(pos)) - np.bincount(index_b, push[:, axis], len(pos))
+        enemies.pos[near] = pos
+        return distant
+
+    def carriers(self) -> list[tuple[object, Vector2]]:
+        """returns (emitter, position) of every enemy carrying a bullet pattern"""
+        emitters = self.enemies.emitter
+        carrying = np.flatnonzero(emitters != None)
+        return [(emitter, Vector2(pos)) for emitter, pos in zip(emitters[carrying].tolist(), self.enemies.pos[carrying].tolist())]
+
+    def despawn(self, pos: Vector2, distance: float) -> None:
+        """removes enemies farther than distance from pos"""
+        offset = self.enemies.pos - np.array(pos)
+        self.enemies.compact(np.hypot(offset[:, 0], offset[:, 1]) < distance)
+
+    def nearest_enemy(self, pos: Vector2) -> Vector2:
+        """returns the position of the enemy nearest to pos, or None if there are no enemies"""
+        if self.enemies.count == 0:
+            return None
+        offset = self.enemies.pos - np.array(pos)
+        return Vector2(self.enemies.pos[np.argmin(np.einsum("ij,ij->i", offset, offset))].tolist())
+
+    def clear(self) -> None:
+        """removes all entities"""
+        self.bullets.clear()
+        self.enemies.clear()
+
+    def draw(self, surface: Surface, draw: Draw, draw_direction: bool, alpha: float = 1.0) -> int:
+        """draws every enemy and bullet overlapping the surface with one batched blit,
+        interpolated between the last two ticks. returns amount drawn"""
+        return self.draw_visible(surface, draw, *self.visible(draw.view(surface), draw_direction, alpha))
+
+    def visible(self, view: tuple[float, float, float, float], draw_direction: bool, alpha: float = 1.0) -> tuple['np.ndarray', 'np.ndarray', 'np.ndarray', list]:
+        """returns palette colors, radii and positions of enemies and bullets overlapping the (left, top, right, bottom) view,
+        and (pos, direction, length) direction lines if draw_direction is set"""
+        enemy_inside, enemy_pos = in_view(self.enemies, view, alpha)
+        bullet_inside, bullet_pos = in_view(self.bullets, view, alpha)
+        # enemies are colored by the life they lost, bullets take the last palette entry
+        enemy_colors = ENEMY_LIFE - self.enemies.life[enemy_inside].clip(1, ENEMY_LIFE)
+        colors = np.concatenate((enemy_colors, np.full(len(bullet_pos), len(ENEMY_COLORS), dtype=enemy_colors.dtype)))
+        radii = np.concatenate((self.enemies.radius[enemy_inside], self.bullets.radius[bullet_inside]))
+        lines = []
+        if draw_direction:
+            for arrays, inside, positions in ((self.enemies, enemy_inside, enemy_pos), (self.bullets, bullet_inside, bullet_pos)):
+                for pos, direction, radius in zip(positions.tolist(), arrays.direction[inside].tolist(), arrays.radius[inside].tolist()):
+                    lines.append((Vector2(pos), Vector2(direction), radius))
+        return colors, radii, np.concatenate((enemy_pos, bullet_pos)), lines
+
+    def draw_visible(self, surface: Surface, draw: Draw, colors: 'np.ndarray', radii: 'np.ndarray', pos: 'np.ndarray', lines: list) -> int:
+        """draws entities returned by visible with one batched blit, returns amount drawn"""
+        # sprites are looked up once per color and radius instead of per entity
+        radii = (radii * draw.scale).astype(np.int64)
+        looks, look = np.unique(radii * len(_PALETTE) + colors, return_inverse=True)
+        sprites = np.empty(len(looks), dtype=object)
+        sprites[:] = [draw.circle_sprite(_PALETTE[key % len(_PALETTE)], key // len(_PALETTE)) for key in looks.tolist()]
+        corners = ((pos - (draw.camera_offset.x, draw.camera_offset.y)) * draw.scale).astype(np.int64) - radii[:, None]
+        surface.blits(zip(sprites[look].tolist(), corners.tolist()), doreturn=False)
+        for line_pos, direction, length in lines:
+            draw.line(surface, DEBUG_LINE_COLOR, line_pos, direction, length, DEBUG_LINE_WIDTH)
+        return len(corners)
+
+def in_view(arrays: EntityArrays, view: tuple[float, float, float, float], alpha: float) -> tuple['np.ndarray', 'np.ndarray']:
+    """returns a mask of entities whose interpolated circle overlaps the (left, top, right, bottom) view, and their positions"""
+    left, top, right, bottom = view
+    pos = arrays.last_pos + (arrays.pos - arrays.last_pos) * alpha
+    radius = arrays.radius
+    inside = (pos[:, 0] > left - radius) & (pos[:, 0] < right + radius) & (pos[:, 1] > top - radius) & (pos[:, 1] < bottom + radius)
+    return inside, pos[inside]
@@ -0,0 +1,408 @@
+import random
+import zlib
+from array import array
+from math import atan2
+from math import cos
+from math import hypot
+from math import pi
+from math import sin
+from pygame.math import Vector2
+from typing import Callable
+from .constants import BULLET_RADIUS
+from .constants import COLLISION_CELL_SIZE
+from .constants import ENEMY_DESPAWN_RATE
+from .constants import ENEMY_LOD_DISTANCE_SCALE
+from .constants import ENEMY_LOD_INTERVAL
+from .constants import ENEMY_PATTERN_EVERY
+from .constants import ENEMY_SPAWN_COUNT
+from .constants import ENEMY_SPAWN_RATE
+from .constants import ENEMY_SPEED
+from .constants import FPS
+from .constants import PLAYER_RADIUS
+from .constants import random_vector
+from .constants import WEAPON_BULLETS
+from .constants import WEAPON_COOLDOWN_FRAMES
+from .constants import WEAPON_DAMAGE
+from .constants import WEAPON_RELOAD_FRAMES
+from .entity_store import EntityStore
+from .entity_store import is_available as entity_store_available
+from .game_object import Bullet
+from .game_object import Enemy
+from .game_object import GameObject
+from .game_object import Player
+from .game_object import sweep_time
+from .game_object import test_collision
+from .patterns import Emitter
+from .patterns import load_patterns
+from .patterns import ProjectileStore
+from .pool import ObjectPool
+from .pool import swap_remove
+from .profiler import FrameProfiler
+from .spatial_hash import SpatialHash
+
+# every step snaps its inputs to the precision replays store, aim directions as 16 bit angles and movement axes as fixed point,
+# so a game plays the same whether or not it is recorded
+INPUT_AIM_STEPS = 1 << 16
+INPUT_MOVE_SCALE = 128
+
+class GameInput:
+    """inputs applied during a single game step"""
+
+    def __init__(self, move: Vector2 = None, firing: bool = False, aim: Vector2 = None):
+        self.move = Vector2(0) if move is None else move
+        self.firing = firing
+        self.aim = Vector2(1, 0) if aim is None else aim
+
+def aim_angle(direction: Vector2) -> int:
+    """returns the direction as a 16 bit angle"""
+    return round(atan2(direction.y, direction.x) / (2 * pi) * INPUT_AIM_STEPS) % INPUT_AIM_STEPS
+
+def angle_aim(angle: int) -> Vector2:
+    """returns the unit vector of a 16 bit angle"""
+    radians = angle / INPUT_AIM_STEPS * 2 * pi
+    return Vector2(cos(radians), sin(radians))
+
+def quantize_inputs(inputs: GameInput) -> GameInput:
+    """snaps inputs to the precision stored in replays, so recorded games play back identically"""
+    inputs.move = Vector2(round(inputs.move.x * INPUT_MOVE_SCALE), round(inputs.move.y * INPUT_MOVE_SCALE)) / INPUT_MOVE_SCALE
+    inputs.aim = angle_aim(aim_angle(inputs.aim))
+    return inputs
+
+# simulation parameters that can be overridden per game, with their defaults
+PARAMETERS = {"enemy_despawn_rate": ENEMY_DESPAWN_RATE,
+              "enemy_lod_interval": ENEMY_LOD_INTERVAL,
+              "enemy_pattern_every": ENEMY_PATTERN_EVERY,
+              "enemy_spawn_count": ENEMY_SPAWN_COUNT,
+              "enemy_spawn_rate": ENEMY_SPAWN_RATE,
+              "enemy_speed": ENEMY_SPEED,
+              "weapon_bullets": WEAPON_BULLETS,
+              "weapon_cooldown_frames": WEAPON_COOLDOWN_FRAMES,
+              "weapon_damage": WEAPON_DAMAGE,
+              "weapon_reload_frames": WEAPON_RELOAD_FRAMES}
+
+# lowest allowed values of parameters that are used as divisors or counts
+PARAMETER_MINIMUMS = {"enemy_lod_interval": 1,
+                      "enemy_pattern_every": 0,
+                      "enemy_spawn_count": 1,
+                      "enemy_spawn_rate": 1}
+
+class Game:
+    """game simulation, stepped one frame at a time without needing a window"""
+
+    def __init__(self, surface_size: Vector2, use_entity_store: bool = False, profiler: FrameProfiler = None, seed: int = None, params: dict = None):
+        self.use_entity_store = use_entity_store
+        # every game draws from its own random stream
+        self.rng = random.Random()
+        self.seed: int = None
+        for name, value in PARAMETERS.items():
+            setattr(self, name, value)
+        for name, value in (params or {}).items():
+            if name not in PARAMETERS:
+                raise KeyError(f"Unknown game parameter: '{name}'")
+            if value < PARAMETER_MINIMUMS.get(name, value):
+                raise ValueError(f"Game parameter '{name}' must be at least {PARAMETER_MINIMUMS[name]}: {value}")
+            setattr(self, name, value)
+        self.profiler = FrameProfiler() if profiler is None else profiler
+        # called with an event name and value on enemy spawns and despawns
+        self.on_event: Callable[[str, int], None] = None
+        self.enemy_hash = SpatialHash(COLLISION_CELL_SIZE)
+        self.bullet_pool = ObjectPool(lambda: Bullet(Vector2(0), Vector2(0)))
+        self.enemy_pool = ObjectPool(lambda: Enemy(Vector2(0)))
+        # hostile bullet patterns need numpy and pattern files, they are only loaded when enabled
+        self.patterns = load_patterns() if self.enemy_pattern_every > 0 else ()
+        self.projectiles = ProjectileStore() if self.patterns else None
+        if self.enemy_pattern_every and not self.patterns:
+            raise ValueError("Enemy bullet patterns need numpy and pattern files")
+        self.candidate_pairs_bullet = 0
+        self.candidate_pairs_enemy = 0
+        self.lod_enemies = 0
+        self.enemies_spawned = 0
+        self.current_enemy_spawn_time = 0
+        self.current_enemy_despawn_time = 0
+        self.frames = 0
+        self.death_frame: int = None
+        self.enemy_spawn_distance = 0.0
+        self.enemy_lod_distance = 0.0
+        self.player: Player = None
+        self.obj_bullet: list[Bullet] = None
+        self.obj_enemy: list[Enemy] = None
+        self.store: EntityStore = None
+        self.weapon_cooldown = 0
+        self.weapon_reload = 0
+        self.stats: dict = None
+        self.resize(surface_size)
+        self.reset(seed)
+
+    @property
+    def enemy_count(self) -> int:
+        return len(self.obj_enemy) if self.store is None else self.store.enemies.count
+
+    @property
+    def bullet_count(self) -> int:
+        return len(self.obj_bullet) if self.store is None else self.store.bullets.count
+
+    @property
+    def projectile_count(self) -> int:
+        return 0 if self.projectiles is None else self.projectiles.count
+
+    @property
+    def survival_seconds(self) -> float:
+        """seconds the player has survived, up to their death"""
+        return (self.frames if self.death_frame is None else self.death_frame) / FPS
+
+    def nearest_enemy(self, pos: Vector2) -> Vector2:
+        """returns the position of the enemy nearest to pos, or None if there are no enemies"""
+        if self.store is not None:
+            return self.store.nearest_enemy(pos)
+        if not self.obj_enemy:
+            return None
+        return min(self.obj_enemy, key=lambda enemy: pos.distance_squared_to(enemy.pos)).pos.copy()
+
+    def objects_in_view(self, offset: Vector2, size: Vector2, alpha: float = 1.0) -> list[GameObject]:
+        """returns enemies and bullets whose circle at their render position overlaps the view rectangle"""
+        # objects move less than a cell per tick, grow the query so interpolated positions are covered
+        margin = self.enemy_hash.cell_size
+        left, top = offset.x, offset.y
+        right, bottom = left + size.x, top + size.y
+        candidates = self.enemy_hash.query_rect(left - margin, top - margin, right + margin, bottom + margin)
+        visible = []
+        for obj in candidates + self.obj_bullet:
+            pos = obj.render_pos(alpha)
+            if left - obj.radius < pos.x < right + obj.radius and top - obj.radius < pos.y < bottom + obj.radius:
+                visible.append(obj)
+        return visible
+
+    def checksum(self) -> int:
+        """returns a crc32 of the world state, used to detect diverging replays"""
+        player = self.player
+        values = [player.pos.x, player.pos.y, player._life, player.i_frames, self.frames, self.weapon_cooldown, self.weapon_reload]
+        values += self.stats.values()
+        for obj in self.obj_enemy + self.obj_bullet:
+            values += (obj.pos.x, obj.pos.y, obj._life)
+        crc = zlib.crc32(array("d", values))
+        batched = [] if self.store is None else [self.store.enemies, self.store.bullets]
+        if self.projectiles is not None:
+            batched.append(self.projectiles.projectiles)
+        for arrays in batched:
+            crc = zlib.crc32(arrays.pos.tobytes(), crc)
+            crc = zlib.crc32(arrays.life.tobytes(), crc)
+        return crc
+
+    def reset(self, seed: int = None) -> None:
+        """resets game data, a new seed is drawn if none is given"""
+        # reseed so the game can be replayed from its seed
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.rng.seed(self.seed)
+        # reset game objects
+        self.player = Player(Vector2(0))
+        if self.obj_bullet is None:
+            self.obj_bullet, self.obj_enemy = [], []
+        else:
+            swap_remove(self.obj_bullet, _discard, self.bullet_pool)
+            swap_remove(self.obj_enemy, _discard, self.enemy_pool)
+        self.enemy_hash.build(self.obj_enemy)
+        # use array-backed entities if enabled and numpy is installed
+        self.store = EntityStore() if self.use_entity_store and entity_store_available() else None
+        if self.projectiles is not None:
+            self.projectiles.clear()
+        if self.store is not None:
+            self.store.enemy_speed = self.enemy_speed
+        # reset timers
+        self.enemies_spawned = 0
+        self.current_enemy_spawn_time = int(self.enemy_spawn_rate / 2)
+        self.current_enemy_despawn_time = self.enemy_despawn_rate
+        # reset weapon time
+        self.weapon_cooldown = 0
+        self.weapon_reload = 0
+        # reset game stats
+        self.frames = 0
+        self.death_frame = None
+        self.stats = {"bullets": self.weapon_bullets,
+                      "distance": 0.0,
+                      "hits": 0,
+                      "kills": 0,
+                      "shots": 0}
+
+    def resize(self, surface_size: Vector2) -> None:
+        """updates values that depend on the screen size"""
+        self.enemy_spawn_distance = surface_size.magnitude() * 0.55
+        self.enemy_lod_distance = surface_size.magnitude() * ENEMY_LOD_DISTANCE_SCALE
+
+    def step(self, inputs: GameInput) -> None:
+        """advances the simulation by one frame. the inputs are snapped to replay precision, the given ones are left as they are"""
+        inputs = quantize_inputs(GameInput(inputs.move, inputs.firing, inputs.aim))
+        player, stats, store, profiler = self.player, self.stats, self.store, self.profiler
+        # keep positions from the start of the tick for render interpolation
+        player.last_pos.update(player.pos)
+        for obj in self.obj_enemy:
+            obj.last_pos.update(obj.pos)
+        for obj in self.obj_bullet:
+            obj.last_pos.update(obj.pos)
+        if store is not None:
+            store.begin_tick()
+        if self.projectiles is not None:
+            self.projectiles.begin_tick()
+        # spawn enemies around player
+        profiler.begin("spawn")
+        self.current_enemy_spawn_time -= 1
+        if self.current_enemy_spawn_time == 0:
+            self.current_enemy_spawn_time = self.enemy_spawn_rate
+            for _ in range(self.enemy_spawn_count):
+                direction = random_vector(self.rng)
+                # every nth enemy carries the next pattern
+                emitter, every = None, self.enemy_pattern_every
+                if self.patterns and every and self.enemies_spawned % every == every - 1:
+                    emitter = Emitter(self.patterns[(self.enemies_spawned // every) % len(self.patterns)])
+                if store is not None:
+                    store.spawn_enemy(player.pos + (direction * self.enemy_spawn_distance), self.enemies_spawned % self.enemy_lod_interval, self.frames, emitter)
+                else:
+                    enemy = self.enemy_pool.acquire()
+                    enemy.reset(player.pos.x + direction.x * self.enemy_spawn_distance, player.pos.y + direction.y * self.enemy_spawn_distance)
+                    enemy.speed = self.enemy_speed
+                    enemy.lod_phase = self.enemies_spawned % self.enemy_lod_interval
+                    enemy.lod_frame = self.frames - 1
+                    enemy.emitter = emitter
+                    self.obj_enemy.append(enemy)
+                self.enemies_spawned += 1
+            if self.on_event is not None:
+                self.on_event("spawn", self.enemy_count)
+        # update player
+        profiler.begin("player")
+        original_pos = player.pos.copy()
+        if player.is_alive():
+            player.update(inputs.move)
+            if self.weapon_cooldown > 0:
+                self.weapon_cooldown -= 1
+            elif self.weapon_reload > 0:
+                self.weapon_reload -= 1
+                if self.weapon_reload == 0:
+                    # reload finished
+                    stats["bullets"] = self.weapon_bullets
+        stats["distance"] += (player.pos - original_pos).length()
+        # fire a bullet in the aim direction if bullets are available
+        # player weapon not on cooldown or reloading, and player is alive
+        if inputs.firing and self.weapon_cooldown == 0 and self.weapon_reload == 0 and player.is_alive():
+            self._fire(inputs.aim)
+        # update bullets and their collision
+        profiler.begin("bullets")
+        if store is not None:
+            stats["hits"] += store.update_bullets(self.weapon_damage)
+            stats["kills"] += store.remove_dead()
+        self._update_bullets()
+        # remove dead game objects
+        swap_remove(self.obj_bullet, Bullet.is_alive, self.bullet_pool)
+        # increment kill for each dead enemy
+        stats["kills"] += swap_remove(self.obj_enemy, Enemy.is_alive, self.enemy_pool)
+        # update enemies and their collision
+        profiler.begin("enemies")
+        if store is not None:
+            self.lod_enemies = store.update_enemies(player, self.frames, self.enemy_lod_interval, self.enemy_lod_distance)
+        else:
+            self._update_enemies()
+        # emit and update enemy bullet patterns
+        profiler.begin("patterns")
+        if self.projectiles is not None:
+            if player.is_alive():
+                for enemy in self.obj_enemy:
+                    if enemy.emitter is not None:
+                        enemy.emitter.update(self.projectiles, enemy.pos, player.pos)
+                if store is not None:
+                    for emitter, pos in store.carriers():
+                        emitter.update(self.projectiles, pos, player.pos)
+            self.projectiles.update(player)
+        # check despawn timer
+        profiler.begin("despawn")
+        self.current_enemy_despawn_time -= 1
+        if self.current_enemy_despawn_time == 0:
+            self.current_enemy_despawn_time = self.enemy_despawn_rate
+            enemy_count = self.enemy_count
+            # keep the hash matching the enemy list, it is reused for culling between steps
+            if swap_remove(self.obj_enemy, self._in_spawn_distance, self.enemy_pool):
+                self.enemy_hash.build(self.obj_enemy)
+            if store is not None:
+                store.despawn(player.pos, self.enemy_spawn_distance)
+            if self.on_event is not None:
+                self.on_event("despawn", enemy_count - self.enemy_count)
+        self.frames += 1
+        if self.death_frame is None and not player.is_alive():
+            self.death_frame = self.frames
+        profiler.end()
+
+    def _fire(self, direction: Vector2) -> None:
+        # update stats
+        self.stats["bullets"] -= 1
+        self.stats["shots"] += 1
+        # if last bullet begin reload
+        if self.stats["bullets"] == 0:
+            self.weapon_reload = self.weapon_reload_frames
+        # if bullets remain, start cooldown
+        else:
+            self.weapon_cooldown = self.weapon_cooldown_frames
+        # create new bullet object in front of player
+        offset = PLAYER_RADIUS + BULLET_RADIUS
+        if self.store is not None:
+            self.store.spawn_bullet(self.player.pos + (direction * offset), direction)
+        else:
+            bullet = self.bullet_pool.acquire()
+            bullet.reset(self.player.pos.x + direction.x * offset, self.player.pos.y + direction.y * offset, direction)
+            self.obj_bullet.append(bullet)
+
+    def _in_spawn_distance(self, enemy: Enemy) -> bool:
+        return hypot(self.player.pos.x - enemy.pos.x, self.player.pos.y - enemy.pos.y) < self.enemy_spawn_distance
+
+    def _update_bullets(self) -> None:
+        self.enemy_hash.build(self.obj_enemy)
+        self.candidate_pairs_bullet = 0
+        for bullet in self.obj_bullet:
+            bullet.update()
+            # check the path travelled this tick against nearby enemies so fast bullets cannot tunnel through them
+            half_x = (bullet.pos.x - bullet.last_pos.x) / 2
+            half_y = (bullet.pos.y - bullet.last_pos.y) / 2
+            candidates = self.enemy_hash.query(Vector2(bullet.last_pos.x + half_x, bullet.last_pos.y + half_y), bullet.radius + hypot(half_x, half_y))
+            self.candidate_pairs_bullet += len(candidates)
+            hit, hit_time = None, 2.0
+            for _, enemy in candidates:
+                t = sweep_time(bullet, enemy)
+                if t is not None and t < hit_time:
+                    hit, hit_time = enemy, t
+            # the earliest enemy along the path takes the hit
+            if hit is not None:
+                bullet.kill()
+                hit.damage(self.weapon_damage)
+                self.stats["hits"] += 1
+
+    def _update_enemies(self) -> None:
+        self.enemy_hash.build(self.obj_enemy)
+        self.candidate_pairs_enemy = 0
+        self.lod_enemies = 0
+        player, interval, frame = self.player, self.enemy_lod_interval, self.frames
+        phase = frame % interval
+        for i, enemy in enumerate(self.obj_enemy):
+            if interval > 1 and hypot(player.pos.x - enemy.pos.x, player.pos.y - enemy.pos.y) > self.enemy_lod_distance:
+                # distant enemies catch up every few frames and skip separation
+                self.lod_enemies += 1
+                # phases of enemies spawned with a longer interval wrap around
+                if enemy.lod_phase % interval == phase:
+                    enemy.update(player, frame - enemy.lod_frame)
+                    enemy.lod_frame = frame
+                    self.enemy_hash.move(i, enemy)
+                continue
+            # enemies that were distant catch up the frames they skipped
+            enemy.update(player, frame - enemy.lod_frame)
+            enemy.lod_frame = frame
+            # test enemy collision against nearby enemies in list order
+            candidates = self.enemy_hash.query(enemy.pos, enemy.radius)
+            self.candidate_pairs_enemy += len(candidates)
+            c = 0
+            while c < len(candidates):
+                index, enemy_ = candidates[c]
+                c += 1
+                if test_collision(enemy, enemy_):
+                    # enemy was repositioned, gather the remaining candidates around its new position
+                    candidates = [candidate for candidate in self.enemy_hash.query(enemy.pos, enemy.radius) if candidate[0] > index]
+                    self.candidate_pairs_enemy += len(candidates)
+                    c = 0
+            self.enemy_hash.move(i, enemy)
+
+def _discard(obj: GameObject) -> bool:
+    return False
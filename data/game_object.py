@@ -3,6 +3,9 @@ from pygame import Surface
 from pygame.math import Vector2
 from abc import ABC
 from abc import abstractmethod
+from math import hypot
+from math import sqrt
+from typing import Sequence
 from .constants import BULLET_COLOR
 from .constants import BULLET_LIFE
 from .constants import BULLET_RADIUS
@@ -25,13 +28,17 @@ from .draw import Draw
 class GameObject(ABC):
     """abstract game object"""
 
+    __slots__ = ("pos", "last_pos", "radius", "speed", "color", "direction", "_life")
+
     @abstractmethod
-    def __init__(self, pos: Vector2, radius: int, speed: float, color: Color, life: float = None, direction: Vector2 = Vector2(0)):
-        self.pos = pos
+    def __init__(self, pos: Vector2, radius: int, speed: float, color: Color, life: float = None, direction: Vector2 = None):
+        # vectors are owned by the object and updated in place
+        self.pos = pos.copy()
+        self.last_pos = pos.copy()
         self.radius = radius
         self.speed = speed
         self.color = color
-        self.direction = direction
+        self.direction = Vector2(0) if direction is None else direction.copy()
         self._life = life
 
     def is_alive(self) -> bool:
@@ -46,24 +53,33 @@ class GameObject(ABC):
         """instantly kills the game object"""
         self._life = 0
 
-    def update(self) -> None:
-        """moves the game object with its direction"""
-        self.pos += make_framerate_independent(self.direction * self.speed)
+    def update(self, steps: int = 1) -> None:
+        """moves the game object with its direction for the amount of frames"""
+        step = make_framerate_independent(self.speed) * steps
+        self.pos.x += self.direction.x * step
+        self.pos.y += self.direction.y * step
+
+    def render_pos(self, alpha: float) -> Vector2:
+        """returns the position interpolated between the last two ticks"""
+        return self.last_pos.lerp(self.pos, alpha)
 
-    def draw(self, surface: Surface, draw: Draw, draw_direction: bool) -> None:
+    def draw(self, surface: Surface, draw: Draw, draw_direction: bool, alpha: float = 1.0) -> None:
         """draws the object to the surface"""
         if self.is_alive():
-            draw.circle(surface, self.color, self.pos, self.radius)
+            pos = self.render_pos(alpha)
+            draw.circle(surface, self.color, pos, self.radius)
             if draw_direction:
-                draw.line(surface, DEBUG_LINE_COLOR, self.pos, self.direction, self.radius, DEBUG_LINE_WIDTH)
+                draw.line(surface, DEBUG_LINE_COLOR, pos, self.direction, self.radius, DEBUG_LINE_WIDTH)
 
     def is_touching(self, other: 'GameObject') -> bool:
         """returns if this gameobject is touching the other gameobject"""
-        return (self.pos - other.pos).magnitude() < self.radius + other.radius
+        return hypot(self.pos.x - other.pos.x, self.pos.y - other.pos.y) < self.radius + other.radius
 
 class Player(GameObject):
     """player game object"""
 
+    __slots__ = ("i_frames",)
+
     def __init__(self, pos: Vector2):
         super().__init__(pos, PLAYER_RADIUS, PLAYER_SPEED, PLAYER_COLOR, PLAYER_LIFE)
         self.i_frames = 0
@@ -84,23 +100,32 @@ class Player(GameObject):
         if not self.is_vulnerable():
             self.i_frames -= 1
         # normalize input vector
-        self.direction = input.copy()
+        self.direction.update(input)
         if self.direction.length() != 0.0 and not self.direction.is_normalized():
-            self.direction = self.direction.normalize()
+            self.direction.normalize_ip()
         # update movement this frame
         super().update()
 
-    def draw(self, surface: Surface, draw: Draw, draw_direction: bool) -> None:
+    def draw(self, surface: Surface, draw: Draw, draw_direction: bool, alpha: float = 1.0) -> None:
         """draws the player. if damaged, draw every other frame"""
         if self.i_frames % 2 == 0:
-            super().draw(surface, draw, draw_direction)
+            super().draw(surface, draw, draw_direction, alpha)
 
 class Bullet(GameObject):
     """bullet game object"""
 
+    __slots__ = ()
+
     def __init__(self, pos: Vector2, direction: Vector2):
         super().__init__(pos, BULLET_RADIUS, BULLET_SPEED, BULLET_COLOR, BULLET_LIFE, direction)
 
+    def reset(self, x: float, y: float, direction: Vector2) -> None:
+        """reinitializes a pooled bullet"""
+        self.pos.update(x, y)
+        self.last_pos.update(x, y)
+        self.direction.update(direction)
+        self._life = BULLET_LIFE
+
     def update(self) -> None:
         # tick life
         self.damage()
@@ -110,29 +135,89 @@ class Bullet(GameObject):
 class Enemy(GameObject):
     """enemy game object"""
 
+    __slots__ = ("lod_phase", "lod_frame", "emitter")
+
     def __init__(self, pos: Vector2):
         super().__init__(pos, ENEMY_RADIUS, ENEMY_SPEED, ENEMY_COLORS[0], ENEMY_LIFE)
+        # frame offset of reduced rate updates, spreads distant enemies across frames
+        self.lod_phase = 0
+        # frame the enemy last moved at, reduced rate updates catch up the frames since
+        self.lod_frame = -1
+        # bullet pattern carried by the enemy, if any
+        self.emitter = None
+
+    def reset(self, x: float, y: float) -> None:
+        """reinitializes a pooled enemy"""
+        self.pos.update(x, y)
+        self.last_pos.update(x, y)
+        self.direction.update(0, 0)
+        self.color = ENEMY_COLORS[0]
+        self._life = ENEMY_LIFE
+        self.lod_frame = -1
+        self.emitter = None
 
     def damage(self, amount: int = 1) -> None:
         super().damage(amount)
         if self.is_alive():
             self.color = ENEMY_COLORS[ENEMY_LIFE - self._life]
 
-    def update(self, player: Player) -> None:
-        """moves the enemy towards the player"""
+    def update(self, player: Player, steps: int = 1) -> None:
+        """moves the enemy towards the player for the amount of frames"""
+        # tracking compounds over the frames covered
+        tracking = ENEMY_TRACKING if steps == 1 else 1 - (1 - ENEMY_TRACKING) ** steps
         # move towards player position
-        self.direction = self.direction.lerp(
-            (player.pos - self.pos).normalize(), ENEMY_TRACKING)
+        x = player.pos.x - self.pos.x
+        y = player.pos.y - self.pos.y
+        length = hypot(x, y)
+        if length != 0.0:
+            self.direction.x += (x / length - self.direction.x) * tracking
+            self.direction.y += (y / length - self.direction.y) * tracking
         # update movement this frame
-        super().update()
+        super().update(steps)
         # check player collision
         if test_collision(self, player):
             player.damage()
 
 def test_collision(obj_1: GameObject, obj_2: GameObject) -> bool:
     """if objects collide, reposition. returns if collided"""
-    if obj_1 is not obj_2 and obj_1.is_touching(obj_2):
-        # reposition self
-        obj_1.pos = obj_2.pos - (obj_2.pos - obj_1.pos).normalize() * (obj_1.radius + obj_2.radius)
-        return True
+    if obj_1 is not obj_2:
+        x = obj_1.pos.x - obj_2.pos.x
+        y = obj_1.pos.y - obj_2.pos.y
+        distance = hypot(x, y)
+        radius = obj_1.radius + obj_2.radius
+        if distance < radius and distance != 0.0:
+            # reposition self in place
+            scale = radius / distance
+            obj_1.pos.update(obj_2.pos.x + x * scale, obj_2.pos.y + y * scale)
+            return True
     return False
+
+def sweep_time(obj: GameObject, other: GameObject) -> float:
+    """returns the fraction of obj's move this tick, from last_pos to pos, at which it first touches other.
+    returns None if it does not touch other along the way"""
+    # solve |start + t * travel - other| = radius for the earliest t
+    travel_x = obj.pos.x - obj.last_pos.x
+    travel_y = obj.pos.y - obj.last_pos.y
+    x = obj.last_pos.x - other.pos.x
+    y = obj.last_pos.y - other.pos.y
+    radius = obj.radius + other.radius
+    c = x * x + y * y - radius * radius
+    if c < 0.0:
+        # already touching at the start
+        return 0.0
+    a = travel_x * travel_x + travel_y * travel_y
+    b = 2 * (x * travel_x + y * travel_y)
+    discriminant = b * b - 4 * a * c
+    if a == 0.0 or discriminant <= 0.0:
+        return None
+    t = (-b - sqrt(discriminant)) / (2 * a)
+    return t if 0.0 <= t <= 1.0 else None
+
+def render_list(objects: Sequence[GameObject], draw_direction: bool, alpha: float = 1.0) -> tuple[list[tuple[Color, Vector2, float]], list[tuple[Vector2, Vector2, float]]]:
+    """returns (color, pos, radius) circles of every alive game object interpolated between the last two ticks,
+    and (pos, direction, length) direction lines if draw_direction is set"""
+    alive = [obj for obj in objects if obj.is_alive()]
+    positions = [obj.render_pos(alpha) for obj in alive]
+    circles = [(obj.color, pos, obj.radius) for obj, pos in zip(alive, positions)]
+    lines = [(pos, obj.direction.copy(), obj.radius) for obj, pos in zip(alive, positions)] if draw_direction else []
+    return circles, lines
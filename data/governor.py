@@ -0,0 +1,83 @@
+from collections import deque
+from .constants import FPS
+from .constants import GOVERNOR_BUDGET
+from .constants import GOVERNOR_DEGRADE_SECONDS
+from .constants import GOVERNOR_HEADROOM
+from .constants import GOVERNOR_RESTORE_SECONDS
+from .constants import seconds_to_frames
+
+""" adaptive quality """
+
+# quality stages from full quality down, each one also applies the ones before it
+QUALITY_STAGES = ("full", "no_anti_aliasing", "no_direction_lines", "flat_background", "distant_enemy_lod")
+
+class QualityGovernor:
+    """lowers quality a stage at a time while frames go over budget, and restores it a stage at a time once
+    frames have had headroom for a while. restoring takes longer and needs more headroom than degrading,
+    so quality does not flip back and forth at the edge of the budget"""
+
+    def __init__(self, budget: float = GOVERNOR_BUDGET, degrade_seconds: float = GOVERNOR_DEGRADE_SECONDS,
+                 restore_seconds: float = GOVERNOR_RESTORE_SECONDS, headroom: float = GOVERNOR_HEADROOM):
+        # budget is in simulation ticks
+        self.budget = budget / FPS
+        self.headroom = headroom
+        self.degrade_frames = seconds_to_frames(degrade_seconds)
+        self.stage = 0
+        self.changes = 0
+        # recent frame times and their sums over the degrade and restore windows
+        self._frames: deque[float] = deque(maxlen=seconds_to_frames(restore_seconds))
+        self._degrade_sum = 0.0
+        self._restore_sum = 0.0
+
+    @property
+    def name(self) -> str:
+        """name of the current stage"""
+        return QUALITY_STAGES[self.stage]
+
+    @property
+    def anti_aliasing(self) -> bool:
+        """returns if anti-aliased drawing is allowed"""
+        return self.stage < 1
+
+    @property
+    def direction_lines(self) -> bool:
+        """returns if debug direction lines are allowed"""
+        return self.stage < 2
+
+    @property
+    def flat_background(self) -> bool:
+        """returns if the background is filled with a flat color instead of drawn from tiles"""
+        return self.stage >= 3
+
+    @property
+    def enemy_lod(self) -> bool:
+        """returns if distant enemies are simulated at lower fidelity"""
+        return self.stage >= 4
+
+    def update(self, seconds: float) -> int:
+        """adds the work time of a frame, returns the stage change: 1 when degraded, -1 when restored, otherwise 0"""
+        frames = self._frames
+        if len(frames) == frames.maxlen:
+            self._restore_sum -= frames[0]
+        if len(frames) >= self.degrade_frames:
+            self._degrade_sum -= frames[-self.degrade_frames]
+        frames.append(seconds)
+        self._degrade_sum += seconds
+        self._restore_sum += seconds
+        change = 0
+        if len(frames) >= self.degrade_frames and self._degrade_sum / self.degrade_frames > self.budget:
+            change = 1 if self.stage < len(QUALITY_STAGES) - 1 else 0
+        elif len(frames) == frames.maxlen and self._restore_sum / len(frames) < self.budget * self.headroom:
+            change = -1 if self.stage > 0 else 0
+        if change != 0:
+            self.stage += change
+            self.changes += 1
+            # the next change is judged on frames taken at the new stage
+            self.reset_window()
+        return change
+
+    def reset_window(self) -> None:
+        """forgets the recent frame times, used when frame times are not comparable to the ones before"""
+        self._frames.clear()
+        self._degrade_sum = 0.0
+        self._restore_sum = 0.0
@@ -0,0 +1,76 @@
+from pygame import Color
+from pygame import Surface
+from pygame import SRCALPHA
+from pygame.math import Vector2
+from typing import Callable
+from .assets import AssetCache
+from .constants import DEBUG_LINE_WIDTH
+from .constants import UI_BORDER_OFFSET
+from .constants import UI_WEAPON_WIDTH
+from .draw import Draw
+
+""" heads-up display """
+
+IMAGE_BULLET_SCALE = Vector2(16, 32)
+IMAGE_HEART_SCALE = Vector2(32)
+IMAGE_HEART_SPACE_SCALE = IMAGE_HEART_SCALE / 4
+# weapon bar length at full cooldown or reload, relative to the surface width
+WEAPON_BAR_SCALE = 0.2
+
+class Hud:
+    """life, ammo and weapon bar, each rendered to a cached layer that is redrawn only when its values change.
+    the layers are composited with a single blits call"""
+
+    def __init__(self, assets: AssetCache):
+        self.assets = assets
+        self.renders = 0
+        self._layers: dict[str, tuple[tuple, Surface, tuple[float, float]]] = {}
+
+    def draw(self, surface: Surface, draw: Draw, life: int, bullets: int, bar: tuple[Color, float] = None) -> None:
+        """draws the hud, bar is the weapon bar color and how full it is"""
+        size = surface.get_size()
+        blit_info = []
+        if life > 0:
+            blit_info.append(self._layer("hearts", (life, size), lambda: self._render_hearts(life, size)))
+        if bullets > 0:
+            blit_info.append(self._layer("ammo", (bullets, size), lambda: self._render_ammo(bullets, size)))
+        if bar is not None:
+            color, fraction = bar
+            length = round(fraction * size[0] * WEAPON_BAR_SCALE)
+            if length > 0:
+                key = (tuple(color), length, draw.anti_aliasing, size)
+                blit_info.append(self._layer("weapon_bar", key, lambda: self._render_weapon_bar(draw, color, length, size)))
+        surface.blits(blit_info, doreturn=False)
+
+    def clear(self) -> None:
+        """forgets every cached layer"""
+        self._layers.clear()
+
+    def _layer(self, name: str, key: tuple, render: Callable[[], tuple[Surface, tuple[float, float]]]) -> tuple[Surface, tuple[float, float]]:
+        entry = self._layers.get(name)
+        if entry is None or entry[0] != key:
+            entry = self._layers[name] = (key, *render())
+            self.renders += 1
+        return entry[1], entry[2]
+
+    def _render_hearts(self, life: int, size: tuple[int, int]) -> tuple[Surface, tuple[float, float]]:
+        heart = self.assets.image("heart", IMAGE_HEART_SCALE)
+        step = IMAGE_HEART_SCALE.x + IMAGE_HEART_SPACE_SCALE.x
+        layer = Surface((life * step - IMAGE_HEART_SPACE_SCALE.x, IMAGE_HEART_SCALE.y), SRCALPHA)
+        layer.blits([(heart, (step * i, 0)) for i in range(life)], doreturn=False)
+        # centered along the bottom
+        return layer, (size[0] / 2 - layer.get_width() / 2, size[1] - IMAGE_HEART_SCALE.y - UI_BORDER_OFFSET)
+
+    def _render_ammo(self, bullets: int, size: tuple[int, int]) -> tuple[Surface, tuple[float, float]]:
+        bullet = self.assets.image("bullet", IMAGE_BULLET_SCALE)
+        layer = Surface((bullets * IMAGE_BULLET_SCALE.x, IMAGE_BULLET_SCALE.y), SRCALPHA)
+        layer.blits([(bullet, (IMAGE_BULLET_SCALE.x * i, 0)) for i in range(bullets)], doreturn=False)
+        # bottom right corner, bullets are used from the left
+        return layer, (size[0] - UI_BORDER_OFFSET - layer.get_width(), size[1] - UI_BORDER_OFFSET - IMAGE_BULLET_SCALE.y)
+
+    def _render_weapon_bar(self, draw: Draw, color: Color, length: int, size: tuple[int, int]) -> tuple[Surface, tuple[float, float]]:
+        height = max(UI_WEAPON_WIDTH, DEBUG_LINE_WIDTH) + 2
+        layer = Surface((length + 2, height), SRCALPHA)
+        draw.line_no_offset(layer, color, Vector2(1, height / 2), Vector2(1, 0), length, UI_WEAPON_WIDTH)
+        # centered along the top
+        return layer, (size[0] / 2 - length / 2 - 1, UI_BORDER_OFFSET - height / 2)
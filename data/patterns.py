@@ -0,0 +1,228 @@
+import json
+import os
+from functools import lru_cache
+from math import atan2
+from math import degrees
+from math import pi
+from math import sin
+from pygame import Color
+from pygame import Surface
+from pygame import Vector2
+from .constants import FPS
+from .constants import make_framerate_independent
+from .constants import PATTERN_DIRECTORY
+from .constants import seconds_to_frames
+from .draw import Draw
+from .entity_store import EntityArrays
+from .entity_store import in_view
+from .entity_store import near_cells
+from .game_object import Player
+
+# numpy is optional, enemy bullet patterns are unavailable without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+""" data-driven enemy bullet patterns """
+
+EMITTERS = ("radial", "spiral", "aimed", "wave", "burst")
+
+# spec values used when a pattern file leaves them out
+_DEFAULTS = {"count": 1,
+             "speed": 200.0,
+             "interval": 1.0,
+             "angle": 0.0,
+             "spread": 0.0,
+             "spin": 0.0,
+             "amplitude": 0.0,
+             "frequency": 0.0,
+             "burst": 1,
+             "burst_interval": 0.1,
+             "radius": 6,
+             "life": 4.0,
+             "color": [255, 64, 192]}
+
+def is_available() -> bool:
+    """returns if numpy is installed and bullet patterns can be used"""
+    return np is not None
+
+class PatternSpec:
+    """emitter settings loaded from a pattern file. times are in seconds, angles in degrees"""
+
+    def __init__(self, name: str, data: dict):
+        emitter = data.get("emitter")
+        if emitter not in EMITTERS:
+            raise ValueError(f"Pattern '{name}' has an invalid emitter: '{emitter}'")
+        for key in data:
+            if key != "emitter" and key not in _DEFAULTS:
+                raise ValueError(f"Pattern '{name}' has an invalid setting: '{key}'")
+        values = {**_DEFAULTS, **data}
+        self.name = name
+        self.emitter = emitter
+        self.count = int(values["count"])
+        if self.count < 1:
+            raise ValueError(f"Pattern '{name}' needs a count of at least 1: {self.count}")
+        self.speed = make_framerate_independent(float(values["speed"]))
+        self.interval = max(1, seconds_to_frames(values["interval"]))
+        self.angle = float(values["angle"])
+        self.spread = float(values["spread"])
+        self.spin = float(values["spin"])
+        self.amplitude = float(values["amplitude"])
+        self.frequency = float(values["frequency"])
+        self.burst = int(values["burst"])
+        self.burst_interval = max(1, seconds_to_frames(values["burst_interval"]))
+        self.radius = float(values["radius"])
+        self.life = seconds_to_frames(values["life"])
+        self.color = Color(values["color"])
+        # a fan of count bullets spread evenly, or a full ring for radial emitters
+        if emitter in ("radial", "spiral"):
+            self._offsets = np.arange(self.count) * (360 / self.count)
+        elif self.count > 1:
+            self._offsets = np.linspace(-self.spread / 2, self.spread / 2, self.count)
+        else:
+            self._offsets = np.zeros(1)
+
+    def angles(self, emission: int, aim: float) -> 'np.ndarray':
+        """returns bullet angles of an emission, aim is the angle towards the player"""
+        if self.emitter in ("radial", "spiral"):
+            # rings rotate by spin every emission
+            center = self.angle + self.spin * emission
+        elif self.emitter == "wave":
+            # fan sweeps back and forth around the aim
+            center = aim + self.angle + self.amplitude * sin(2 * pi * self.frequency * emission * self.interval / FPS)
+        else:
+            center = aim + self.angle
+        return center + self._offsets
+
+@lru_cache
+def load_patterns(directory: str = PATTERN_DIRECTORY) -> tuple[PatternSpec, ...]:
+    """returns the pattern specs of every json file in the directory, sorted by name"""
+    if np is None or not os.path.isdir(directory):
+        return ()
+    patterns = []
+    for file in sorted(os.listdir(directory)):
+        if file.endswith(".json"):
+            with open(os.path.join(directory, file)) as input:
+                patterns.append(PatternSpec(file[:-5], json.load(input)))
+    return tuple(patterns)
+
+class Emitter:
+    """pattern state of a single carrier"""
+
+    __slots__ = ("spec", "timer", "emissions", "burst_left")
+
+    def __init__(self, spec: PatternSpec):
+        self.spec = spec
+        # wait a full interval before the first emission
+        self.timer = spec.interval
+        self.emissions = 0
+        self.burst_left = spec.burst
+
+    def update(self, projectiles: 'ProjectileStore', pos: Vector2, target: Vector2) -> None:
+        """counts down and emits bullets from pos when due"""
+        self.timer -= 1
+        if self.timer > 0:
+            return
+        spec = self.spec
+        aim = degrees(atan2(target.y - pos.y, target.x - pos.x))
+        projectiles.emit(spec, pos, spec.angles(self.emissions, aim))
+        self.emissions += 1
+        self.burst_left -= 1
+        if self.burst_left > 0:
+            self.timer = spec.burst_interval
+        else:
+            self.timer = spec.interval
+            self.burst_left = spec.burst
+
+class ProjectileArrays(EntityArrays):
+    """entity arrays with a style index per projectile, directions hold the velocity per frame"""
+
+    _ARRAYS = EntityArrays._ARRAYS + ("_style",)
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__(capacity)
+        self._style = np.zeros(capacity, dtype=np.int32)
+
+    @property
+    def style(self) -> 'np.ndarray':
+        return self._style[:self.count]
+
+class ProjectileStore:
+    """hostile projectiles moved, hit tested and drawn in batches"""
+
+    def __init__(self):
+        self.projectiles = ProjectileArrays()
+        self.hits = 0
+        # color and radius of every style
+        self._looks: list[tuple[Color, int]] = []
+        self._styles: dict[tuple[tuple[int, int, int, int], int], int] = {}
+
+    @property
+    def count(self) -> int:
+        return self.projectiles.count
+
+    def begin_tick(self) -> None:
+        """stores current positions for interpolation"""
+        self.projectiles.last_pos[:] = self.projectiles.pos
+
+    def emit(self, spec: PatternSpec, pos: Vector2, angles: 'np.ndarray') -> None:
+        """adds a projectile at pos for every angle"""
+        radians = np.radians(angles)
+        velocity = np.column_stack((np.cos(radians), np.sin(radians))) * spec.speed
+        start = self.projectiles.extend(np.broadcast_to((pos.x, pos.y), velocity.shape), velocity, spec.life, spec.radius)
+        self.projectiles.style[start:] = self._style(spec.color, spec.radius)
+
+    def update(self, player: Player) -> None:
+        """moves projectiles, ticks their life and damages the player when touched"""
+        projectiles = self.projectiles
+        if projectiles.count == 0:
+            return
+        projectiles.pos[:] += projectiles.direction
+        projectiles.life[:] -= 1
+        if player.is_alive():
+            # broad phase on grid cells spanning the largest touching distance. the player is the only query,
+            # so this is one linear pass over the projectile cells rather than a bucketed grid
+            reach = projectiles.radius + player.radius
+            near = near_cells(projectiles.pos, (player.pos.x, player.pos.y), reach.max())
+            offset = projectiles.pos[near] - (player.pos.x, player.pos.y)
+            touching = near[np.hypot(offset[:, 0], offset[:, 1]) < reach[near]]
+            if len(touching) > 0:
+                projectiles.life[touching] = 0
+                self.hits += len(touching)
+                player.damage()
+        projectiles.compact(projectiles.life > 0)
+
+    def clear(self) -> None:
+        """removes all projectiles"""
+        self.projectiles.clear()
+        self.hits = 0
+
+    def draw(self, surface: Surface, draw: Draw, alpha: float = 1.0) -> int:
+        """draws projectiles overlapping the surface with one batched blit, returns amount drawn"""
+        return self.draw_visible(surface, draw, *self.visible(draw.view(surface), alpha))
+
+    def visible(self, view: tuple[float, float, float, float], alpha: float = 1.0) -> tuple['np.ndarray', 'np.ndarray']:
+        """returns the styles and interpolated positions of projectiles overlapping the (left, top, right, bottom) view"""
+        inside, pos = in_view(self.projectiles, view, alpha)
+        return self.projectiles.style[inside], pos
+
+    def draw_visible(self, surface: Surface, draw: Draw, styles: 'np.ndarray', pos: 'np.ndarray') -> int:
+        """draws projectiles returned by visible with one batched blit, returns amount drawn"""
+        # every style is one sprite, so blit positions and sprites are looked up per array instead of per projectile.
+        # styles are copied since a simulation thread may add more while drawing
+        looks = self._looks[:]
+        radii = (np.array([radius for _, radius in looks], dtype=np.int64) * draw.scale).astype(np.int64)
+        sprites = np.empty(len(looks), dtype=object)
+        sprites[:] = [draw.circle_sprite(color, radius) for (color, _), radius in zip(looks, radii.tolist())]
+        corners = ((pos - (draw.camera_offset.x, draw.camera_offset.y)) * draw.scale).astype(np.int64) - radii[styles][:, None]
+        surface.blits(zip(sprites[styles].tolist(), corners.tolist()), doreturn=False)
+        return len(corners)
+
+    def _style(self, color: Color, radius: float) -> int:
+        key = (tuple(color), int(radius))
+        style = self._styles.get(key)
+        if style is None:
+            style = self._styles[key] = len(self._looks)
+            self._looks.append((color, int(radius)))
+        return style
@@ -0,0 +1,93 @@
+from queue import Queue
+from pygame.math import Vector2
+from threading import Thread
+from typing import Callable
+from .draw import Camera
+from .game import Game
+from .game_object import render_list
+
+""" simulation and rendering on separate threads """
+
+class RenderState:
+    """everything a frame draws from the game, copied after the simulation ticks of the frame.
+    it is not changed once captured, so it can be drawn while the game simulates the next frame"""
+
+    __slots__ = ("ticks", "alpha", "camera", "layers", "entities", "projectiles", "drawn", "alive", "life", "player_pos", "player_render_pos",
+                 "stats", "weapon", "enemies", "bullets", "projectile_count", "debug", "events", "phases")
+
+    def __init__(self, game: Game, camera: Camera, view_size: Vector2, alpha: float, ticks: int, draw_direction: bool):
+        player = game.player
+        self.ticks = ticks
+        self.alpha = alpha
+        # the camera offset drawn with is interpolated the same way, so culling matches what is drawn
+        self.camera = camera.ticks()
+        offset = self.camera[0].lerp(self.camera[1], alpha)
+        view = (offset.x, offset.y, offset.x + view_size.x, offset.y + view_size.y)
+        # (color, pos, radius) circles and (pos, direction, length) lines drawn in order, damaged players blink every other tick
+        self.layers = [render_list([player] if player.i_frames % 2 == 0 else [], draw_direction, alpha),
+                       render_list(game.objects_in_view(offset, view_size, alpha), draw_direction, alpha)]
+        # palette colors, radii, positions and direction lines of visible entity store entities, drawn after the layers
+        self.entities = None if game.store is None else game.store.visible(view, draw_direction, alpha)
+        # styles and positions of visible projectiles
+        self.projectiles = None if game.projectiles is None else game.projectiles.visible(view, alpha)
+        self.drawn = sum(len(circles) for circles, _ in self.layers) - len(self.layers[0][0])
+        if self.entities is not None:
+            self.drawn += len(self.entities[2])
+        if self.projectiles is not None:
+            self.drawn += len(self.projectiles[1])
+        self.alive = player.is_alive()
+        self.life = player._life
+        self.player_pos = player.pos.copy()
+        self.player_render_pos = player.render_pos(alpha)
+        self.stats = dict(game.stats)
+        # weapon cooldown and reload left, as fractions of their full time
+        self.weapon = (game.weapon_cooldown / max(game.weapon_cooldown_frames, 1), game.weapon_reload / max(game.weapon_reload_frames, 1))
+        self.enemies = game.enemy_count
+        self.bullets = game.bullet_count
+        self.projectile_count = game.projectile_count
+        # debug info lines, game events and phase times of the simulation, filled in by the caller.
+        # the main thread records them, so nothing it owns is written from the simulation thread
+        self.debug: list[str] = []
+        self.events: list[tuple[str, int]] = []
+        self.phases: dict[str, float] = {}
+
+class SimulationThread:
+    """runs one simulation job at a time on a worker thread, so the next frame can simulate while the current one renders.
+    the game must not be touched by other threads while a job runs"""
+
+    def __init__(self):
+        self.busy = False
+        self._jobs: Queue = Queue()
+        self._results: Queue = Queue()
+        self._worker = Thread(target=self._run, name="simulation", daemon=True)
+        self._worker.start()
+
+    def submit(self, job: Callable[[], RenderState]) -> None:
+        """starts a job, the previous one must have been collected with wait"""
+        if self.busy:
+            raise RuntimeError("Simulation job submitted while another is running")
+        self.busy = True
+        self._jobs.put(job)
+
+    def wait(self) -> RenderState:
+        """blocks until the running job is done and returns its result. exceptions raised by the job are raised here"""
+        result = self._results.get()
+        self.busy = False
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def close(self) -> None:
+        """waits for the running job, then stops the worker"""
+        if self.busy:
+            self.wait()
+        self._jobs.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        while (job := self._jobs.get()) is not None:
+            try:
+                result = job()
+            except BaseException as error:
+                result = error
+            self._results.put(result)
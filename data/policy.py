@@ -0,0 +1,39 @@
+from math import cos
+from math import sin
+from pygame.math import Vector2
+from typing import Callable
+from .constants import FPS
+from .game import Game
+from .game import GameInput
+
+""" scripted bot policies for headless games """
+
+def idle_policy(game: Game, frame: int) -> GameInput:
+    """stands still without firing"""
+    return GameInput()
+
+def circle_policy(game: Game, frame: int) -> GameInput:
+    """walks in a circle, firing at the nearest enemy"""
+    angle = frame / FPS
+    move = Vector2(cos(angle), sin(angle))
+    nearest = game.nearest_enemy(game.player.pos)
+    if nearest is not None:
+        offset = nearest - game.player.pos
+        if offset.length() != 0.0:
+            return GameInput(move, True, offset.normalize())
+    return GameInput(move, False, move.copy())
+
+def kite_policy(game: Game, frame: int) -> GameInput:
+    """walks away from the nearest enemy while firing at it"""
+    nearest = game.nearest_enemy(game.player.pos)
+    if nearest is None:
+        return GameInput()
+    offset = nearest - game.player.pos
+    if offset.length() == 0.0:
+        return GameInput()
+    aim = offset.normalize()
+    return GameInput(-aim, True, aim)
+
+POLICIES: dict[str, Callable[[Game, int], GameInput]] = {"idle": idle_policy,
+                                                         "circle": circle_policy,
+                                                         "kite": kite_policy}
@@ -0,0 +1,47 @@
+from typing import Callable
+from typing import Generic
+from typing import TypeVar
+from .game_object import GameObject
+
+""" object pooling """
+
+T = TypeVar("T", bound=GameObject)
+
+class ObjectPool(Generic[T]):
+    """free list of released objects, reused instead of allocating new ones"""
+
+    def __init__(self, factory: Callable[[], T]):
+        self.allocations = 0
+        self._factory = factory
+        self._free: list[T] = []
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> T:
+        """returns a released object, or a new one if none are free. callers reset it"""
+        if self._free:
+            return self._free.pop()
+        self.allocations += 1
+        return self._factory()
+
+    def release(self, obj: T) -> None:
+        """returns an object to the free list"""
+        self._free.append(obj)
+
+def swap_remove(objects: list[T], keep: Callable[[T], bool], pool: ObjectPool[T]) -> int:
+    """removes objects not kept by swapping in the last object, releasing them to the pool.
+    does not preserve order, returns amount removed"""
+    removed = 0
+    i = 0
+    while i < len(objects):
+        obj = objects[i]
+        if keep(obj):
+            i += 1
+        else:
+            last = objects.pop()
+            if i < len(objects):
+                objects[i] = last
+            pool.release(obj)
+            removed += 1
+    return removed
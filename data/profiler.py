@@ -0,0 +1,191 @@
+import csv
+import gc
+import json
+import os
+import sys
+from collections import deque
+from datetime import datetime
+from queue import Queue
+from threading import Thread
+from time import perf_counter
+from .constants import FLIGHT_RECORDER_BUDGET
+from .constants import FLIGHT_RECORDER_SECONDS
+from .constants import FPS
+from .constants import seconds_to_frames
+
+""" frame phase timing """
+
+class FrameProfiler:
+    """times named phases of each frame and keeps a rolling window of samples"""
+
+    def __init__(self, window: int = seconds_to_frames(2)):
+        self.enabled = False
+        self.phases: list[str] = []
+        self._frames: deque[dict[str, float]] = deque(maxlen=window)
+        self._current: dict[str, float] = {}
+        self._phase: str = None
+        self._start = 0.0
+        self._frame_count = 0
+
+    def begin(self, phase: str, start: float = None) -> None:
+        """ends the running phase and starts timing the next one, from start if given"""
+        if not self.enabled:
+            return
+        now = perf_counter() if start is None else start
+        if self._phase is not None:
+            self._current[self._phase] = self._current.get(self._phase, 0.0) + (now - self._start)
+        self._phase = phase
+        self._start = now
+
+    def end(self) -> None:
+        """ends the running phase without starting another"""
+        if not self.enabled or self._phase is None:
+            return
+        self._current[self._phase] = self._current.get(self._phase, 0.0) + (perf_counter() - self._start)
+        self._phase = None
+
+    def end_frame(self) -> None:
+        """stores the phase times of the finished frame"""
+        if not self.enabled:
+            return
+        self.end()
+        for phase in self._current:
+            if phase not in self.phases:
+                self.phases.append(phase)
+        self._frames.append(dict(self._current))
+        self._current.clear()
+        self._frame_count += 1
+
+    @property
+    def last_frame(self) -> dict[str, float]:
+        """phase times in seconds of the last finished frame"""
+        return self._frames[-1] if self._frames else {}
+
+    def summary(self) -> list[tuple[str, float, float, float]]:
+        """returns (phase, mean, p95, max) in milliseconds for every phase"""
+        result = []
+        for phase in self.phases:
+            samples = sorted(frame[phase] for frame in self._frames if phase in frame)
+            if not samples:
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            result.append((phase, sum(samples) / len(samples) * 1000, p95 * 1000, samples[-1] * 1000))
+        return result
+
+    def export_csv(self, file: str) -> int:
+        """writes the sampled frames to a csv file in milliseconds, returns amount of rows"""
+        first_frame = self._frame_count - len(self._frames)
+        with open(file, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["frame"] + self.phases)
+            for i, frame in enumerate(self._frames):
+                writer.writerow([first_frame + i] + [f"{frame[phase] * 1000:.4f}" if phase in frame else "" for phase in self.phases])
+        return len(self._frames)
+
+class AllocationCounter:
+    """tracks net allocated memory blocks per frame and garbage collections"""
+
+    def __init__(self):
+        self.blocks = 0
+        self.collections = 0
+        self._last_blocks = sys.getallocatedblocks()
+        gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self.collections += 1
+
+    def end_frame(self) -> None:
+        """stores the change in allocated blocks since the last frame"""
+        blocks = sys.getallocatedblocks()
+        self.blocks = blocks - self._last_blocks
+        self._last_blocks = blocks
+
+class FlightRecorder:
+    """keeps records of the last frames and writes them to disk on a background thread
+    when a frame takes longer than the budget"""
+
+    def __init__(self, directory: str, budget: float = FLIGHT_RECORDER_BUDGET, seconds: float = FLIGHT_RECORDER_SECONDS, max_fps: int = 240, min_interval: float = 1.0):
+        self.directory = directory
+        # budget is in simulation ticks
+        self.budget = budget / FPS
+        self.seconds = seconds
+        self.min_interval = min_interval
+        self.dumps = 0
+        self._records: deque[tuple] = deque(maxlen=int(seconds * max_fps))
+        self._last_dump: float = None
+        self._events: list[tuple] = []
+        # collections run on whichever thread allocates, deque appends and pops are thread-safe
+        self._gc_events: deque[tuple] = deque()
+        self._frame = 0
+        self._start = perf_counter()
+        self._last_time: float = None
+        self._gc_start = 0.0
+        # dumps are written by one worker so they never block the game loop
+        self._queue: Queue = Queue()
+        self._worker = Thread(target=self._write_dumps, name="flight_recorder", daemon=True)
+        self._worker.start()
+        gc.callbacks.append(self._on_gc)
+
+    def event(self, kind: str, value: int = 0) -> None:
+        """records an event during the current frame, only called from the thread that ends frames"""
+        self._events.append((kind, value))
+
+    def end_frame(self, phases: dict[str, float], enemies: int, bullets: int, projectiles: int, check: bool = True) -> bool:
+        """stores a record of the finished frame, dumps the buffer if the frame was over budget and check is set.
+        returns if a dump was queued"""
+        now = perf_counter()
+        frame_time = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+        while self._gc_events:
+            self._events.append(self._gc_events.popleft())
+        self._records.append((self._frame, now - self._start, frame_time, phases, enemies, bullets, projectiles, self._events))
+        self._events = []
+        self._frame += 1
+        # hitches right after a dump are usually the same stutter, skip them
+        if check and frame_time > self.budget and (self._last_dump is None or now - self._last_dump > self.min_interval):
+            self.dump(f"hitch_{datetime.now():%Y%m%d_%H%M%S}_frame_{self._frame - 1}")
+            return True
+        return False
+
+    def dump(self, name: str) -> None:
+        """queues the buffered records to be written to a json file"""
+        self.dumps += 1
+        self._last_dump = perf_counter()
+        self._queue.put((os.path.join(self.directory, f"{name}.json"), list(self._records), self._last_dump - self._start - self.seconds))
+
+    def close(self) -> None:
+        """waits for queued dumps to be written and stops the worker"""
+        gc.callbacks.remove(self._on_gc)
+        self._queue.put(None)
+        self._worker.join()
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._gc_start = perf_counter()
+        else:
+            self._gc_events.append(("gc", info["generation"], (perf_counter() - self._gc_start) * 1000))
+
+    def _write_dumps(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            file, records, cutoff = job
+            frames = [{"frame": frame,
+                       "time": time,
+                       "frame_ms": frame_time * 1000,
+                       "phases_ms": {phase: seconds * 1000 for phase, seconds in phases.items()},
+                       "enemies": enemies,
+                       "bullets": bullets,
+                       "projectiles": projectiles,
+                       "events": events}
+                      for frame, time, frame_time, phases, enemies, bullets, projectiles, events in records
+                      if time >= cutoff]
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(file, "w") as output:
+                    json.dump({"budget_ms": self.budget * 1000, "frames": frames}, output)
+                print(f"Frame over budget, wrote {len(frames)} frame records to '{file}'")
+            except OSError as error:
+                print(f"Could not write flight recorder dump: {error}")
@@ -0,0 +1,236 @@
+import struct
+from pygame.math import Vector2
+from typing import Iterator
+from .constants import seconds_to_frames
+from .game import aim_angle
+from .game import angle_aim
+from .game import Game
+from .game import GameInput
+from .game import INPUT_AIM_STEPS
+from .game import INPUT_MOVE_SCALE
+from .game import PARAMETERS
+
+""" compact input replays """
+
+# header: magic, version, seed, surface width and height, entity store flag, checksum interval
+_MAGIC = b"BHRP"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBqHH?H")
+# record tags, each followed by its fields
+_TAG_END = 0
+_TAG_FRAMES = 1
+_TAG_MOVE = 2
+_TAG_FIRING = 3
+_TAG_AIM = 4
+_TAG_RESIZE = 5
+_TAG_CHECKSUM = 6
+_TAG_PARAMETER = 7
+
+CHECKSUM_INTERVAL = seconds_to_frames(1)
+
+class ReplayError(Exception):
+    """raised when a replay file is invalid or playback diverges from the recording"""
+
+def _write_varint(data: bytearray, value: int) -> None:
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+
+def _zigzag(value: int) -> int:
+    # signed to unsigned so small deltas of either sign stay small
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if value & 1 == 0 else -((value + 1) >> 1)
+
+def _read_varint(data: bytes, i: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        if i >= len(data):
+            raise ReplayError("Replay ended unexpectedly")
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, i
+
+class ReplayRecorder:
+    """records the inputs of every game step, storing only the fields that changed"""
+
+    def __init__(self, seed: int, surface_size: Vector2, entity_store: bool, checksum_interval: int = CHECKSUM_INTERVAL):
+        if not -(1 << 63) <= seed < 1 << 63:
+            raise ValueError(f"Replay seeds must fit in a signed 64 bit integer: {seed}")
+        self.header = _HEADER.pack(_MAGIC, _VERSION, seed, int(surface_size.x), int(surface_size.y), entity_store, checksum_interval)
+        self.checksum_interval = checksum_interval
+        self._data = bytearray()
+        # unchanged frames not yet written
+        self._run = 0
+        self._move = (0, 0)
+        self._firing = False
+        self._aim = 0
+
+    def record(self, game: Game, inputs: GameInput) -> None:
+        """records the inputs of a step the game just took"""
+        data = self._data
+        move = (round(inputs.move.x * INPUT_MOVE_SCALE), round(inputs.move.y * INPUT_MOVE_SCALE))
+        aim = aim_angle(inputs.aim)
+        if move != self._move or inputs.firing != self._firing or aim != self._aim:
+            self._flush()
+            # every changed field is stored as the difference to its last value
+            if move != self._move:
+                data.append(_TAG_MOVE)
+                _write_varint(data, _zigzag(move[0] - self._move[0]))
+                _write_varint(data, _zigzag(move[1] - self._move[1]))
+                self._move = move
+            if inputs.firing != self._firing:
+                data.append(_TAG_FIRING)
+                data.append(inputs.firing)
+                self._firing = inputs.firing
+            if aim != self._aim:
+                # wrap around so turning past 0 stays a small step
+                delta = (aim - self._aim + INPUT_AIM_STEPS // 2) % INPUT_AIM_STEPS - INPUT_AIM_STEPS // 2
+                data.append(_TAG_AIM)
+                _write_varint(data, _zigzag(delta))
+                self._aim = aim
+        self._run += 1
+        if game.frames % self.checksum_interval == 0:
+            self._flush()
+            data.append(_TAG_CHECKSUM)
+            _write_varint(data, game.frames)
+            data += struct.pack("<I", game.checksum())
+
+    def resize(self, surface_size: Vector2) -> None:
+        """records a change of the surface size before the next step"""
+        self._flush()
+        self._data.append(_TAG_RESIZE)
+        self._data += struct.pack("<HH", int(surface_size.x), int(surface_size.y))
+
+    def parameter(self, name: str, value: float) -> None:
+        """records a change of a game parameter before the next step"""
+        self._flush()
+        self._data.append(_TAG_PARAMETER)
+        encoded = name.encode("ascii")
+        self._data.append(len(encoded))
+        self._data += encoded
+        self._data += struct.pack("<d", value)
+
+    def to_bytes(self) -> bytes:
+        """returns the replay file contents recorded so far"""
+        data = bytearray(self._data)
+        if self._run > 0:
+            data.append(_TAG_FRAMES)
+            _write_varint(data, self._run)
+        data.append(_TAG_END)
+        return self.header + data
+
+    def save(self, file: str) -> int:
+        """writes the replay to a file, returns its size in bytes"""
+        data = self.to_bytes()
+        with open(file, "wb") as output:
+            output.write(data)
+        return len(data)
+
+    def _flush(self) -> None:
+        if self._run > 0:
+            self._data.append(_TAG_FRAMES)
+            _write_varint(self._data, self._run)
+            self._run = 0
+
+class Replay:
+    """a loaded replay file"""
+
+    def __init__(self, data: bytes):
+        if len(data) < _HEADER.size:
+            raise ReplayError("Replay is missing its header")
+        magic, version, self.seed, width, height, self.entity_store, self.checksum_interval = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ReplayError("Not a replay file")
+        if version != _VERSION:
+            raise ReplayError(f"Unsupported replay version: {version}")
+        self.surface_size = Vector2(width, height)
+        self._data = data
+
+    @classmethod
+    def load(cls, file: str) -> 'Replay':
+        """reads a replay file"""
+        with open(file, "rb") as input:
+            return cls(input.read())
+
+    def records(self) -> Iterator[tuple]:
+        """yields ('frames', inputs, count), ('resize', size), ('parameter', name, value) and ('checksum', frame, crc) in order"""
+        data, i = self._data, _HEADER.size
+        move_x, move_y, firing, aim = 0, 0, False, 0
+        while i < len(data):
+            tag = data[i]
+            i += 1
+            if tag == _TAG_END:
+                return
+            elif tag == _TAG_FRAMES:
+                count, i = _read_varint(data, i)
+                yield "frames", GameInput(Vector2(move_x, move_y) / INPUT_MOVE_SCALE, firing, angle_aim(aim)), count
+            elif tag == _TAG_MOVE:
+                delta, i = _read_varint(data, i)
+                move_x += _unzigzag(delta)
+                delta, i = _read_varint(data, i)
+                move_y += _unzigzag(delta)
+            elif tag == _TAG_FIRING:
+                firing = bool(data[i])
+                i += 1
+            elif tag == _TAG_AIM:
+                delta, i = _read_varint(data, i)
+                aim = (aim + _unzigzag(delta)) % INPUT_AIM_STEPS
+            elif tag == _TAG_RESIZE:
+                yield "resize", Vector2(struct.unpack_from("<HH", data, i))
+                i += 4
+            elif tag == _TAG_PARAMETER:
+                length = data[i]
+                name = data[i + 1:i + 1 + length].decode("ascii")
+                i += 1 + length
+                if name not in PARAMETERS:
+                    raise ReplayError(f"Unknown game parameter '{name}' at byte {i}")
+                # cast to the type of the parameter default
+                yield "parameter", name, type(PARAMETERS[name])(struct.unpack_from("<d", data, i)[0])
+                i += 8
+            elif tag == _TAG_CHECKSUM:
+                frame, i = _read_varint(data, i)
+                yield "checksum", frame, struct.unpack_from("<I", data, i)[0]
+                i += 4
+            else:
+                raise ReplayError(f"Unknown replay record {tag} at byte {i - 1}")
+        raise ReplayError("Replay ended unexpectedly")
+
+    def create_game(self) -> Game:
+        """returns a game set up as it was when recording began, with the parameters recorded before its first step"""
+        params = {}
+        for record in self.records():
+            if record[0] != "parameter":
+                break
+            params[record[1]] = record[2]
+        try:
+            return Game(self.surface_size, self.entity_store, seed=self.seed, params=params)
+        except ValueError as error:
+            raise ReplayError(f"Replay cannot be played here: {error}")
+
+    def play(self, game: Game = None) -> tuple[Game, int]:
+        """re-simulates the replay as fast as possible, returns the game and amount of checksums verified.
+        raises ReplayError at the first checksum that does not match"""
+        game = self.create_game() if game is None else game
+        verified = 0
+        for record in self.records():
+            match record:
+                case ("frames", inputs, count):
+                    for _ in range(count):
+                        game.step(inputs)
+                case ("resize", size):
+                    game.resize(size)
+                case ("parameter", name, value):
+                    if name == "enemy_pattern_every" and value and not game.patterns:
+                        raise ReplayError("Replay uses enemy bullet patterns, which need numpy and pattern files")
+                    setattr(game, name, value)
+                case ("checksum", frame, crc):
+                    if game.frames != frame or game.checksum() != crc:
+                        raise ReplayError(f"Replay diverged at frame {frame}")
+                    verified += 1
+        return game, verified
@@ -0,0 +1,278 @@
+import struct
+import zlib
+from array import array
+from collections import deque
+from math import isnan
+from math import nan
+from pygame.math import Vector2
+from .constants import ENEMY_COLORS
+from .constants import ENEMY_LIFE
+from .constants import FPS
+from .constants import REWIND_KEYFRAME_SECONDS
+from .constants import REWIND_SECONDS
+from .constants import seconds_to_frames
+from .game import Game
+from .game import GameInput
+from .patterns import Emitter
+
+""" world snapshots and rewinding """
+
+# frames, death frame, weapon cooldown and reload, spawn and despawn timers, enemies spawned, enemy lod interval,
+# stats bullets, distance, hits, kills and shots,
+# player pos, last pos and direction, life and i-frames,
+# random gauss_next, projectile hits, object enemy, emitter and bullet counts, entity store flag and counts, projectile count
+_HEADER = struct.Struct("<qqiiiiqi" "qdqqq" "6dqq" "dq" "III?III")
+# mersenne twister words and index
+_RNG_WORDS = 625
+# per emitter: enemy index, pattern index, timer, emissions and burst left
+_EMITTER_INTS = 5
+# inputs of a step between keyframes: move, firing, aim and the enemy lod interval the step was taken with,
+# which the quality governor changes while the game runs
+_INPUT = struct.Struct("<dd?ddi")
+
+def snapshot(game: Game) -> bytes:
+    """returns the world state as a compact binary buffer.
+    object last positions are left out, every step overwrites them before use"""
+    player, stats, store, projectiles = game.player, game.stats, game.store, game.projectiles
+    enemies, bullets, patterns = game.obj_enemy, game.obj_bullet, game.patterns
+    # emitters of object enemies or of the entity store, whichever holds the enemies
+    carried = [enemy.emitter for enemy in enemies] if store is None else store.enemies.emitter.tolist()
+    emitters = [(i, patterns.index(emitter.spec), emitter.timer, emitter.emissions, emitter.burst_left)
+                for i, emitter in enumerate(carried) if emitter is not None]
+    _, words, gauss_next = game.rng.getstate()
+    data = bytearray(_HEADER.pack(game.frames, -1 if game.death_frame is None else game.death_frame,
+                                  game.weapon_cooldown, game.weapon_reload, game.current_enemy_spawn_time, game.current_enemy_despawn_time, game.enemies_spawned,
+                                  game.enemy_lod_interval, stats["bullets"], stats["distance"], stats["hits"], stats["kills"], stats["shots"],
+                                  *player.pos, *player.last_pos, *player.direction, player._life, player.i_frames,
+                                  nan if gauss_next is None else gauss_next, 0 if projectiles is None else projectiles.hits,
+                                  len(enemies), len(emitters), len(bullets),
+                                  store is not None, 0 if store is None else store.enemies.count, 0 if store is None else store.bullets.count,
+                                  0 if projectiles is None else projectiles.count))
+    data += array("I", words)
+    # one column per field, gathered a vector at a time
+    for objects in (enemies, bullets):
+        data += array("d", [value for obj in objects for value in obj.pos])
+        data += array("d", [value for obj in objects for value in obj.direction])
+        data += array("q", [obj._life for obj in objects])
+    data += array("q", [enemy.lod_phase for enemy in enemies])
+    data += array("q", [enemy.lod_frame for enemy in enemies])
+    data += array("q", [value for emitter in emitters for value in emitter])
+    if store is not None:
+        data += store.enemies.to_bytes()
+        data += store.bullets.to_bytes()
+    if projectiles is not None:
+        data += projectiles.projectiles.to_bytes()
+    return bytes(data)
+
+def restore(game: Game, data: bytes) -> None:
+    """sets the world state of the game to a snapshot taken from it"""
+    (frames, death_frame, game.weapon_cooldown, game.weapon_reload, game.current_enemy_spawn_time, game.current_enemy_despawn_time, game.enemies_spawned,
+     game.enemy_lod_interval, bullets, distance, hits, kills, shots,
+     x, y, last_x, last_y, direction_x, direction_y, life, i_frames,
+     gauss_next, projectile_hits, enemy_count, emitter_count, bullet_count,
+     has_store, store_enemies, store_bullets, projectile_count) = _HEADER.unpack_from(data)
+    if has_store != (game.store is not None):
+        raise ValueError("Snapshot and game differ in using the entity store")
+    if projectile_count > 0 and game.projectiles is None:
+        raise ValueError("Snapshot has projectiles but the game has no bullet patterns")
+    game.frames = frames
+    game.death_frame = None if death_frame < 0 else death_frame
+    game.stats.update(bullets=bullets, distance=distance, hits=hits, kills=kills, shots=shots)
+    player = game.player
+    player.pos.update(x, y)
+    player.last_pos.update(last_x, last_y)
+    player.direction.update(direction_x, direction_y)
+    player._life = life
+    player.i_frames = i_frames
+    words, offset = _read(data, "I", _RNG_WORDS, _HEADER.size)
+    game.rng.setstate((3, tuple(words), None if isnan(gauss_next) else gauss_next))
+    # pooled objects are released and reacquired in snapshot order
+    for objects, pool, count in ((game.obj_enemy, game.enemy_pool, enemy_count), (game.obj_bullet, game.bullet_pool, bullet_count)):
+        pos, offset = _read(data, "d", count * 2, offset)
+        direction, offset = _read(data, "d", count * 2, offset)
+        life, offset = _read(data, "q", count, offset)
+        for obj in objects:
+            pool.release(obj)
+        objects.clear()
+        for i in range(count):
+            obj = pool.acquire()
+            obj.pos.update(pos[i * 2], pos[i * 2 + 1])
+            obj.last_pos.update(obj.pos)
+            obj.direction.update(direction[i * 2], direction[i * 2 + 1])
+            obj._life = life[i]
+            objects.append(obj)
+    lod_phase, offset = _read(data, "q", enemy_count, offset)
+    lod_frame, offset = _read(data, "q", enemy_count, offset)
+    for enemy, phase, frame in zip(game.obj_enemy, lod_phase, lod_frame):
+        enemy.color = ENEMY_COLORS[ENEMY_LIFE - min(max(enemy._life, 1), ENEMY_LIFE)]
+        enemy.speed = game.enemy_speed
+        enemy.lod_phase = phase
+        enemy.lod_frame = frame
+        enemy.emitter = None
+    emitters, offset = _read(data, "q", emitter_count * _EMITTER_INTS, offset)
+    game.enemy_hash.build(game.obj_enemy)
+    if game.store is not None:
+        offset = game.store.enemies.load_bytes(data, store_enemies, offset)
+        offset = game.store.bullets.load_bytes(data, store_bullets, offset)
+    for i in range(0, len(emitters), _EMITTER_INTS):
+        index, pattern, timer, emissions, burst_left = emitters[i:i + _EMITTER_INTS]
+        emitter = Emitter(game.patterns[pattern])
+        emitter.timer, emitter.emissions, emitter.burst_left = timer, emissions, burst_left
+        if game.store is None:
+            game.obj_enemy[index].emitter = emitter
+        else:
+            game.store.enemies.emitter[index] = emitter
+    if game.projectiles is not None:
+        game.projectiles.projectiles.load_bytes(data, projectile_count, offset)
+        game.projectiles.hits = projectile_hits
+
+def _read(data: bytes, typecode: str, count: int, offset: int) -> tuple[array, int]:
+    end = offset + count * array(typecode).itemsize
+    return array(typecode, data[offset:end]), end
+
+def _xor(data: bytes, base: bytes) -> bytes:
+    # unchanged bytes become zero and compress well, bytes past the end of base are kept as they are
+    n = min(len(data), len(base))
+    mixed = int.from_bytes(data[:n], "little") ^ int.from_bytes(base[:n], "little")
+    return mixed.to_bytes(n, "little") + data[n:]
+
+class RewindBuffer:
+    """bounded history for rewinding. a snapshot is kept every keyframe_interval frames, stored compressed as its
+    difference to the keyframe before it. the inputs of the frames in between are kept so any of them can be re-simulated.
+    differencing and compressing a keyframe is spread over the frames until the next one, so no single frame pays for all of it"""
+
+    def __init__(self, seconds: float = REWIND_SECONDS, keyframe_interval: int = seconds_to_frames(REWIND_KEYFRAME_SECONDS)):
+        self.capacity = seconds_to_frames(seconds)
+        self.keyframe_interval = keyframe_interval
+        # keyframes as [frame, compressed difference to the previous keyframe, packed inputs of the frames after it], oldest first
+        self._segments: deque[list] = deque()
+        # oldest and newest keyframe snapshots, the oldest has no difference
+        self._base: bytes = None
+        self._last: bytes = None
+        # newest keyframe whose difference is still being compressed: segment, compressor, snapshot, the keyframe before it and bytes done
+        self._pending: list = None
+        # bytes held by compressed differences and inputs
+        self._stored = 0
+
+    @property
+    def frames(self) -> int:
+        """amount of frames that can be rewound to"""
+        if not self._segments:
+            return 0
+        newest = self._segments[-1]
+        return newest[0] + len(newest[2]) // _INPUT.size - self._segments[0][0] + 1
+
+    @property
+    def seconds(self) -> float:
+        """seconds of history that can be rewound"""
+        return self.frames / FPS
+
+    @property
+    def size(self) -> int:
+        """bytes held by the history"""
+        if self._base is None:
+            return 0
+        size = self._stored + len(self._base)
+        if self._last is not self._base:
+            size += len(self._last)
+        if self._pending is not None and self._pending[3] is not self._base:
+            # the keyframe before the newest is held until the difference to it is compressed
+            size += len(self._pending[3])
+        return size
+
+    @property
+    def bytes_per_second(self) -> float:
+        """memory held per second of history"""
+        return self.size / self.seconds if self.frames > 0 else 0.0
+
+    def record(self, game: Game, inputs: GameInput) -> None:
+        """records a step the game just took with the inputs, keyframes are snapshots taken after the step"""
+        if self._segments and game.frames - self._segments[-1][0] < self.keyframe_interval:
+            self._segments[-1][2] += _INPUT.pack(*inputs.move, inputs.firing, *inputs.aim, game.enemy_lod_interval)
+            self._stored += _INPUT.size
+            # old keyframes are dropped between keyframes, keeping that work off the frames taking snapshots
+            self._trim()
+            if self._pending is not None:
+                # finish before the next keyframe is due
+                self._compress(-(-len(self._pending[2]) // max(self.keyframe_interval - 1, 1)))
+            return
+        self._compress()
+        data = snapshot(game)
+        segment = [game.frames, None, bytearray()]
+        if self._base is None:
+            self._base = data
+        else:
+            segment[1] = bytearray()
+            self._pending = [segment, zlib.compressobj(1), data, self._last, 0]
+        self._last = data
+        self._segments.append(segment)
+        if self.keyframe_interval <= 1:
+            self._trim()
+
+    def rewind(self, game: Game, frames: int) -> int:
+        """sets the game back by frames, limited by the history kept, and drops the history after it.
+        the game must be at the newest recorded frame. returns the amount of frames rewound.
+        the enemy lod interval is left as it was at the target frame"""
+        if not self._segments:
+            return 0
+        self._compress()
+        target = max(game.frames - frames, self._segments[0][0])
+        while self._segments[-1][0] > target:
+            dropped = self._segments.pop()
+            self._stored -= len(dropped[1]) + len(dropped[2])
+        # rebuild the keyframe from the oldest one
+        data = self._base
+        for i in range(1, len(self._segments)):
+            data = _xor(zlib.decompress(self._segments[i][1]), data)
+        self._last = data
+        frame, _, inputs = self._segments[-1]
+        rewound = game.frames - target
+        restore(game, data)
+        # re-simulate from the keyframe to the target frame without reporting events again
+        steps = target - frame
+        on_event, game.on_event = game.on_event, None
+        for move_x, move_y, firing, aim_x, aim_y, game.enemy_lod_interval in _INPUT.iter_unpack(inputs[:steps * _INPUT.size]):
+            game.step(GameInput(Vector2(move_x, move_y), firing, Vector2(aim_x, aim_y)))
+        game.on_event = on_event
+        self._stored -= len(inputs) - steps * _INPUT.size
+        del inputs[steps * _INPUT.size:]
+        return rewound
+
+    def clear(self) -> None:
+        """forgets the history"""
+        self._segments.clear()
+        self._base = None
+        self._last = None
+        self._pending = None
+        self._stored = 0
+
+    def _trim(self) -> None:
+        # the oldest keyframe is dropped once the rest still covers the capacity
+        while len(self._segments) > 1 and self.frames - (self._segments[1][0] - self._segments[0][0]) >= self.capacity:
+            self._stored -= len(self._segments.popleft()[2])
+            following = self._segments[0]
+            if len(self._segments) == 1:
+                # the newest keyframe becomes the oldest, its difference is no longer needed
+                self._base = self._last
+                self._pending = None
+            else:
+                # only a difference still being compressed has to be finished first
+                if self._pending is not None and self._pending[0] is following:
+                    self._compress()
+                self._base = _xor(zlib.decompress(following[1]), self._base)
+            self._stored -= len(following[1])
+            following[1] = None
+
+    def _compress(self, amount: int = None) -> None:
+        # differences and compresses the next amount bytes of the pending keyframe, or all that is left
+        if self._pending is None:
+            return
+        segment, compressor, data, previous, done = self._pending
+        end = len(data) if amount is None else min(done + amount, len(data))
+        segment[1] += compressor.compress(_xor(data[done:end], previous[done:end]))
+        self._pending[4] = end
+        if end == len(data):
+            segment[1] += compressor.flush()
+            segment[1] = bytes(segment[1])
+            self._stored += len(segment[1])
+            self._pending = None
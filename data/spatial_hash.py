@@ -0,0 +1,78 @@
+from math import floor
+from pygame import Vector2
+from typing import Sequence
+from .game_object import GameObject
+
+class SpatialHash:
+    """uniform grid of game objects used as a collision broad-phase"""
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.max_radius = 0
+        self._cells: dict[tuple[int, int], list[tuple[int, GameObject]]] = {}
+        self._keys: list[tuple[int, int]] = []
+
+    def cell(self, pos: Vector2) -> tuple[int, int]:
+        """returns the cell key containing the position"""
+        return (floor(pos.x / self.cell_size), floor(pos.y / self.cell_size))
+
+    def build(self, objects: Sequence[GameObject]) -> None:
+        """clears the grid and inserts every object, indexed by list position"""
+        self._cells.clear()
+        self._keys.clear()
+        self.max_radius = 0
+        for index, obj in enumerate(objects):
+            key = self.cell(obj.pos)
+            self._cells.setdefault(key, []).append((index, obj))
+            self._keys.append(key)
+            if obj.radius > self.max_radius:
+                self.max_radius = obj.radius
+
+    def move(self, index: int, obj: GameObject) -> None:
+        """moves an object to the cell of its current position"""
+        key = self.cell(obj.pos)
+        old_key = self._keys[index]
+        if key != old_key:
+            self._cells[old_key].remove((index, obj))
+            self._cells.setdefault(key, []).append((index, obj))
+            self._keys[index] = key
+
+    def query(self, pos: Vector2, radius: float) -> list[tuple[int, GameObject]]:
+        """returns (index, object) pairs that may touch a circle at pos, sorted by index"""
+        reach = radius + self.max_radius
+        min_x = floor((pos.x - reach) / self.cell_size)
+        max_x = floor((pos.x + reach) / self.cell_size)
+        min_y = floor((pos.y - reach) / self.cell_size)
+        max_y = floor((pos.y + reach) / self.cell_size)
+        candidates = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                cell = self._cells.get((x, y))
+                if cell is not None:
+                    candidates.extend(cell)
+        candidates.sort(key=_index)
+        return candidates
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float) -> list[GameObject]:
+        """returns objects that may overlap the rectangle, in no particular order"""
+        min_x = floor((left - self.max_radius) / self.cell_size)
+        max_x = floor((right + self.max_radius) / self.cell_size)
+        min_y = floor((top - self.max_radius) / self.cell_size)
+        max_y = floor((bottom + self.max_radius) / self.cell_size)
+        result = []
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self._cells):
+            # look up each cell of the rectangle
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    cell = self._cells.get((x, y))
+                    if cell is not None:
+                        result.extend(obj for _, obj in cell)
+        else:
+            # fewer occupied cells than cells in the rectangle, scan the occupied ones
+            for (x, y), cell in self._cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    result.extend(obj for _, obj in cell)
+        return result
+
+def _index(entry: tuple[int, GameObject]) -> int:
+    return entry[0]
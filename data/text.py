@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from enum import Enum
+from pygame import Color
+from pygame import Surface
+from pygame.font import Font
+from .constants import create_font
+
+""" text rendering """
+
+class FontType(Enum):
+    """font types"""
+    NORMAL = 0
+    UI = 1
+    GAMEOVER = 2
+
+FONT_SIZES = {FontType.NORMAL: 24,
+              FontType.UI: 16,
+              FontType.GAMEOVER: 64}
+
+class FontCache(dict):
+    """font objects by font type, each created on first use"""
+
+    def __missing__(self, font_type: FontType) -> Font:
+        font = self[font_type] = create_font(FONT_SIZES[font_type])
+        return font
+
+def create_fonts() -> dict[FontType, Font]:
+    """returns fonts for every font type, constructed lazily"""
+    return FontCache()
+
+def create_text_surface(fonts: dict[FontType, Font], color: Color, font_type: FontType, text: str, anti_aliasing: bool) -> Surface:
+    """returns a surface with colored text"""
+    return fonts[font_type].render(text, anti_aliasing, color)
+
+class TextCache:
+    """bounded least-recently-used cache of rendered text and glyph surfaces"""
+
+    def __init__(self, fonts: dict[FontType, Font], max_size: int = 256):
+        self.fonts = fonts
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._surfaces: OrderedDict[tuple, Surface] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def get(self, color: Color, font_type: FontType, text: str, anti_aliasing: bool) -> Surface:
+        """returns a cached surface with colored text, rendering it if missing"""
+        key = (font_type, tuple(color), text, anti_aliasing)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = create_text_surface(self.fonts, color, font_type, text, anti_aliasing)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def glyph_blits(self, color: Color, font_type: FontType, text: str, anti_aliasing: bool, pos: tuple[float, float]) -> list[tuple[Surface, tuple[float, float]]]:
+        """returns blit info drawing text at pos from cached single character surfaces.
+        used for text that changes every frame, like debug values"""
+        x, y = pos
+        blit_info = []
+        for char in text:
+            glyph = self.get(color, font_type, char, anti_aliasing)
+            blit_info.append((glyph, (x, y)))
+            x += glyph.get_width()
+        return blit_info
+
+    def clear(self) -> None:
+        """removes every cached surface"""
+        self._surfaces.clear()
@@ -1,16 +1,23 @@
 import json
-from enum import Enum
+import os
+from time import perf_counter
+# start of the startup report, taken before the slower imports
+STARTUP_BEGIN = perf_counter()
+from datetime import datetime
+from functools import partial
 import pygame as pg
-from pygame import init as init_pygame
 from pygame import RESIZABLE
+from pygame import Rect
 from pygame import Surface
 from pygame.color import Color
 from pygame.display import flip as update_window
 from pygame.display import iconify as minimize_window
+from pygame.display import init as init_display
 from pygame.display import set_caption as set_window_title
 from pygame.display import set_mode as create_window
+from pygame.display import update as update_window_rects
 from pygame.event import get as get_events
-from pygame.image import load as load_image
+from pygame.font import init as init_font
 from pygame.math import Vector2
 from pygame.mouse import get_pos as get_mouse_pos
 from pygame.time import Clock
@@ -18,44 +25,85 @@ from pygame.transform import scale as scale_surface
 from data.constants import AIM_LINE_COLOR
 from data.constants import AIM_LINE_LENGTH
 from data.constants import AIM_LINE_WIDTH
-from data.constants import BULLET_RADIUS
-from data.constants import create_font
-from data.constants import ENEMY_DESPAWN_RATE
-from data.constants import ENEMY_SPAWN_RATE
-from data.constants import FPS
+from data.constants import DEBUG_LINE_COLOR
+from data.constants import DEBUG_LINE_WIDTH
+from data.constants import FLIGHT_RECORDER_BUDGET
+from data.constants import GOVERNOR_LOD_FACTOR
+from data.constants import IDLE_FPS
+from data.constants import MAX_CATCH_UP_TICKS
 from data.constants import PAUSE_OVERLAY_COLOR
-from data.constants import PLAYER_RADIUS
-from data.constants import random_vector
 from data.constants import seconds_to_frames
 from data.constants import TEXT_DEBUG
 from data.constants import TEXT_GAME_OVER
 from data.constants import TEXT_PAUSE
 from data.constants import TEXT_RESTART
+from data.constants import TICK_SECONDS
 from data.constants import TITLE
 from data.constants import UI_BORDER_OFFSET
-from data.constants import UI_WEAPON_WIDTH
 from data.constants import WEAPON_COOLDOWN_COLOR
 from data.constants import WEAPON_RELOAD_COLOR
+from data.assets import AssetCache
+from data.draw import Camera
 from data.draw import Draw
-from data.game_object import Bullet
-from data.game_object import Enemy
-from data.game_object import Player
-from data.game_object import test_collision
+from data.game import Game
+from data.game import GameInput
+from data.game import PARAMETERS
+from data.game import quantize_inputs
+from data.governor import QualityGovernor
+from data.hud import Hud
+from data.patterns import is_available as patterns_available
+from data.pipeline import RenderState
+from data.pipeline import SimulationThread
+from data.profiler import AllocationCounter
+from data.profiler import FlightRecorder
+from data.profiler import FrameProfiler
+from data.replay import ReplayRecorder
+from data.snapshot import RewindBuffer
+from data.text import create_fonts
+from data.text import FontType
+from data.text import TextCache
 
 """main game script"""
 
-init_pygame()
+# startup phases are timed and reported once the first frame is shown
+startup = FrameProfiler(window=1)
+startup.enabled = True
+startup.begin("imports", STARTUP_BEGIN)
+
+# only the modules the game uses are initialized, audio and joystick init can be slow
+startup.begin("init_pygame")
+init_display()
+init_font()
+
+startup.begin("settings")
 
 # game settings
 SETTINGS_FILE = "data/settings.json"
+PROFILE_DIRECTORY = "profiles"
+HITCH_DIRECTORY = "hitches"
+REPLAY_DIRECTORY = "replays"
 
+ADAPTIVE_QUALITY = "adaptive_quality"
 ANTI_ALIASING = "anti_aliasing"
+ENEMY_PATTERN_EVERY = "enemy_pattern_every"
+ENTITY_STORE = "entity_store"
+HITCH_BUDGET = "hitch_budget"
+PIPELINE = "pipeline"
+RENDER_FPS = "render_fps"
+RENDER_SCALE = "render_scale"
 SCREEN_WIDTH = "screen_width"
 SCREEN_HEIGHT = "screen_height"
 SHOW_AIM_LINE = "show_aim_line"
 SHOW_DEBUG_INFO = "show_debug_info"
 
-DEFAULT_SETTINGS = {ANTI_ALIASING: False,
+DEFAULT_SETTINGS = {ADAPTIVE_QUALITY: True,
+                    ANTI_ALIASING: False,
+                    ENEMY_PATTERN_EVERY: PARAMETERS["enemy_pattern_every"],
+                    ENTITY_STORE: False,
+                    HITCH_BUDGET: FLIGHT_RECORDER_BUDGET,
+                    PIPELINE: False,
+                    RENDER_FPS: 144,
+                    RENDER_SCALE: 1.0,
                     SCREEN_WIDTH: 1024,
                     SCREEN_HEIGHT: 768,
                     SHOW_AIM_LINE: True,
@@ -90,16 +138,15 @@ def toggle_setting(setting: str) -> None:
     settings[setting] = not settings[setting]
     print(f"Toggled '{setting}' to {settings[setting]}")
 
-# fonts
-class FontType(Enum):
-    """font types"""
-    NORMAL = 0
-    UI = 1
-    GAMEOVER = 2
+# world render scales cycled through in game, the setting accepts any value in between
+RENDER_SCALES = (1.0, 0.75, 0.5)
+MIN_RENDER_SCALE = 0.25
+# frames rewound per key press
+REWIND_STEP = seconds_to_frames(1)
 
-FONTS = {FontType.NORMAL: create_font(24),
-         FontType.UI: create_font(16),
-         FontType.GAMEOVER: create_font(64)}
+# fonts, each constructed on first use
+FONTS = create_fonts()
+TEXT_CACHE = TextCache(FONTS)
 
 # font colors
 DEBUG_FONT_COLOR = Color(192, 192, 192)
@@ -108,116 +155,308 @@ PAUSE_FONT_COLOR = Color(255, 255, 255)
 RESTART_FONT_COLOR = Color(255, 255, 255)
 STATS_FONT_COLOR = Color(128, 128, 128)
 
-# video settings
-UI_BULLET_START_POS = None
-
-# create window for images to be loaded
+# create window for images to be converted to
+startup.begin("window")
 create_window(Vector2(settings[SCREEN_WIDTH], settings[SCREEN_HEIGHT]), RESIZABLE)
 
-# images
-def _load_image(file: str, scale: Vector2) -> Surface:
-    return scale_surface(load_image(f"images/{file}.png").convert_alpha(), scale)
+# images, loaded on first use
+ASSETS = AssetCache()
 
-IMAGE_BULLET_SCALE = Vector2(16, 32)
-IMAGE_HEART_SCALE = Vector2(32)
-IMAGE_HEART_SPACE_SCALE = IMAGE_HEART_SCALE / 4
 IMAGE_TILE_SCALE = Vector2(96)
 
-IMAGE_BULLET = _load_image("bullet", IMAGE_BULLET_SCALE)
-IMAGE_HEART = _load_image("heart", IMAGE_HEART_SCALE)
-IMAGE_TILE = _load_image("tile", IMAGE_TILE_SCALE)
-
-IMAGE_BULLET_SIZE = Vector2(IMAGE_BULLET.get_size())
-IMAGE_HEART_SIZE = Vector2(IMAGE_HEART.get_size())
+# health, ammo and weapon bar
+hud = Hud(ASSETS)
 
 # functions
 def create_text_surface(color: Color, font_type: FontType, text: str) -> Surface:
     """returns a surface with colored text"""
-    return FONTS[font_type].render(text, settings[ANTI_ALIASING], color)
+    return TEXT_CACHE.get(color, font_type, text, settings[ANTI_ALIASING])
 
 def surface_apply_fade() -> None:
     """applies fade effect to main surface"""
     surface_main.blit(surface_fade, (0, 0))
 
-def get_mouse_direction() -> Vector2:
-    """returns a normalized vector2 in the direction of the mouse from the player"""
-    return (get_mouse_pos() + draw.camera_offset - player.pos).normalize()
-
-def draw_weapon_bar(color: Color, weapon_current: int, weapon_max: int) -> None:
-    """draws a colored bar representing weapon info"""
-    start = Vector2(SURFACE_CENTER.x, UI_BORDER_OFFSET)
-    length = (weapon_current / weapon_max) * (SURFACE_SIZE.x * 0.2)
-    start.x -= length / 2
-    draw.line_no_offset(surface_main, color, start, Vector2(1, 0), length, UI_WEAPON_WIDTH)
+def get_mouse_direction(pos: Vector2) -> Vector2:
+    """returns a normalized vector2 in the direction of the mouse from the player at pos"""
+    return (get_mouse_pos() + draw.camera_offset - pos).normalize()
+
+def draw_debug_info() -> Rect:
+    """draws debug info onto the main surface, returns the area drawn"""
+    # these are printed top to bottom
+    debug_info = [f"screen_size: {int(SURFACE_SIZE.x)}x{int(SURFACE_SIZE.y)}",
+                  f"render_size: {surface_world.get_width()}x{surface_world.get_height()} scale {draw.scale:.2f}",
+                  f"frames_per_second: {clock.get_fps():.3f}",
+                  f"ticks_this_frame: {state.ticks}",
+                  f"tick_alpha: {state.alpha:.3f}",
+                  f"input_x: {input.x}",
+                  f"input_y: {input.y}",
+                  f"firing: {firing}",
+                  f"pipeline: {settings[PIPELINE]}"]
+    debug_info += state.debug
+    debug_info += [f"entity_offscreen: {state.enemies + state.bullets + state.projectile_count - state.drawn}",
+                   f"background_blits: {tiles_drawn}",
+                   f"hud_renders: {hud.renders}",
+                   f"camera_offset_distance: {state.player_pos.distance_to(draw.camera_offset + SURFACE_CENTER):.3f}",
+                   f"allocated_blocks_per_frame: {allocations.blocks}",
+                   f"gc_collections: {allocations.collections}",
+                   f"hitch_dumps: {flight_recorder.dumps}",
+                   f"quality: {governor.name} stage {governor.stage} changes {governor.changes}",
+                   f"text_cache: {len(TEXT_CACHE)} hits {TEXT_CACHE.hits} misses {TEXT_CACHE.misses}"]
+    # phase timings in milliseconds
+    debug_info += [f"phase_{phase}: mean {mean:.2f} p95 {p95:.2f} max {peak:.2f}" for phase, mean, p95, peak in profiler.summary()]
+    # blit surfaces
+    blit_info = [(create_text_surface(DEBUG_FONT_COLOR, FontType.NORMAL, TEXT_DEBUG), (UI_BORDER_OFFSET + 5, UI_BORDER_OFFSET))]
+    current_height = UI_BORDER_OFFSET + FONTS[FontType.NORMAL].get_height()
+    # debug values change every frame, build them from cached glyphs
+    for i in range(len(debug_info)):
+        blit_info += TEXT_CACHE.glyph_blits(DEBUG_FONT_COLOR, FontType.UI, debug_info[i], settings[ANTI_ALIASING], (UI_BORDER_OFFSET + 5, current_height + (FONTS[FontType.UI].get_height() * i)))
+    rects = surface_main.blits(blit_info)
+    return rects[0].unionall(rects[1:])
+
+def simulation_debug_info() -> list[str]:
+    """returns debug info lines read from the game, taken with the render state"""
+    player = game.player
+    debug_info = [f"pos_x: {player.pos.x:.3f}",
+                  f"pos_y: {player.pos.y:.3f}",
+                  f"direction_x: {player.direction.x:.3f}",
+                  f"direction_y: {player.direction.y:.3f}",
+                  f"entity_store: {game.store is not None}",
+                  f"entity_enemies: {game.enemy_count}",
+                  f"entity_bullets: {game.bullet_count}",
+                  f"entity_projectiles: {game.projectile_count}",
+                  f"enemies_lod: {game.lod_enemies}",
+                  f"candidate_pairs_bullet: {game.candidate_pairs_bullet}",
+                  f"candidate_pairs_enemy: {game.candidate_pairs_enemy}",
+                  f"enemy_spawn_time: {game.current_enemy_spawn_time}",
+                  f"enemy_despawn_time: {game.current_enemy_despawn_time}",
+                  f"weapon_cooldown: {game.weapon_cooldown}",
+                  f"weapon_reload: {game.weapon_reload}",
+                  f"pool_allocations: bullets {game.bullet_pool.allocations} enemies {game.enemy_pool.allocations}",
+                  f"rewind: {rewind.seconds:.1f} s {rewind.bytes_per_second / 1024:.1f} KiB/s"]
+    # read here since the simulation thread adds frames to the simulation profiler
+    if settings[PIPELINE]:
+        debug_info += [f"phase_sim_{phase}: mean {mean:.2f} p95 {p95:.2f} max {peak:.2f}" for phase, mean, p95, peak in sim_profiler.summary()]
+    return debug_info
+
+def capture_state(alpha: float, ticks: int) -> RenderState:
+    """returns what the frame draws from the game, with the debug info if it is shown"""
+    state = RenderState(game, camera, SURFACE_SIZE, alpha, ticks, settings[SHOW_DEBUG_INFO] and governor.direction_lines)
+    if settings[SHOW_DEBUG_INFO]:
+        state.debug = simulation_debug_info()
+    return state
+
+def simulate(ticks: int, inputs: GameInput, alpha: float) -> RenderState:
+    """steps the game ticks times with the inputs of the frame and returns what the frame draws.
+    runs on the simulation thread in pipeline mode, the main thread must not touch the game, camera or recorders meanwhile.
+    game events and simulation phase times are returned with the render state instead of being recorded here"""
+    events = []
+    game.on_event = lambda kind, value: events.append((kind, value))
+    for _ in range(ticks):
+        game.step(inputs)
+        if recorder is not None:
+            recorder.record(game, inputs)
+        rewind.record(game, inputs)
+        camera.update(game.player.pos, SURFACE_SIZE)
+    state = capture_state(alpha, ticks)
+    state.events = events
+    if game.profiler is sim_profiler:
+        sim_profiler.end_frame()
+        state.phases = sim_profiler.last_frame
+    return state
+
+def record_simulation(state: RenderState) -> None:
+    """records the game events and simulation phase times of a render state with the current frame"""
+    global sim_phases
+    for kind, value in state.events:
+        flight_recorder.event(kind, value)
+    sim_phases = state.phases
+
+def apply_quality() -> None:
+    """applies the stage of the quality governor, the settings stay the ceiling"""
+    draw.flat_background = governor.flat_background
+    interval = PARAMETERS["enemy_lod_interval"] * (GOVERNOR_LOD_FACTOR if governor.enemy_lod else 1)
+    if game.enemy_lod_interval != interval:
+        game.enemy_lod_interval = interval
+        # replays change it at the same step
+        if recorder is not None:
+            recorder.parameter("enemy_lod_interval", interval)
+
+def update_pipeline() -> None:
+    """moves the simulation to the worker thread or back to the main thread"""
+    # the phases of a simulation running alongside rendering are timed separately
+    game.profiler = sim_profiler if settings[PIPELINE] else profiler
+
+def report_startup() -> None:
+    """prints the time spent in each startup phase"""
+    phases = startup.summary()
+    print(f"Startup took {sum(mean for _, mean, _, _ in phases):.1f} ms")
+    for phase, mean, _, _ in phases:
+        print(f"  {phase}: {mean:.1f} ms")
+    print(f"  asset cache: {ASSETS.disk_hits} hits, {ASSETS.disk_misses} misses")
+
+def export_profile() -> None:
+    """writes the sampled phase timings to a csv file"""
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    file = os.path.join(PROFILE_DIRECTORY, f"frame_profile_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    rows = profiler.export_csv(file)
+    print(f"Exported {rows} frame samples to '{file}'")
+
+def save_replay() -> None:
+    """writes the inputs of the current game to a replay file"""
+    if recorder is None:
+        print("Replays cannot be saved after rewinding")
+        return
+    os.makedirs(REPLAY_DIRECTORY, exist_ok=True)
+    file = os.path.join(REPLAY_DIRECTORY, f"replay_{datetime.now():%Y%m%d_%H%M%S}.bhr")
+    size = recorder.save(file)
+    print(f"Saved replay of {game.frames} frames to '{file}' ({size} bytes)")
+
+def rewind_game() -> None:
+    """sets the game back a step, the replay recording ends since it no longer matches the game"""
+    global recorder, static_frame, state
+    frames = rewind.rewind(game, REWIND_STEP)
+    if frames == 0:
+        return
+    recorder = None
+    # the game continues at the current quality, not the one of the frame rewound to
+    apply_quality()
+    reset_camera(game.player.pos - SURFACE_CENTER)
+    static_frame = None
+    state = None
+    print(f"Rewound {frames} frames")
+
+def reset_camera(offset: Vector2) -> None:
+    """moves the camera to the offset without interpolation"""
+    camera.reset(offset)
+    draw.reset_camera(offset)
+
+def cycle_render_scale() -> None:
+    """switches to the next world render scale"""
+    scales = [scale for scale in RENDER_SCALES if scale < draw.scale]
+    settings[RENDER_SCALE] = scales[0] if scales else RENDER_SCALES[0]
+    update_render_scale()
+    print(f"Render scale set to {draw.scale}")
+
+def update_render_scale() -> None:
+    """creates the surface the world is drawn to, smaller than the window when the render scale is below 1"""
+    global surface_world, static_frame
+    draw.scale = min(max(float(settings[RENDER_SCALE]), MIN_RENDER_SCALE), 1.0)
+    if draw.scale == 1.0:
+        surface_world = surface_main
+    else:
+        surface_world = Surface((max(1, round(SURFACE_SIZE.x * draw.scale)), max(1, round(SURFACE_SIZE.y * draw.scale))), 0, surface_main)
+    draw.invalidate_background()
+    static_frame = None
 
 def reset_game() -> None:
     """resets game data"""
-    global player, obj_bullet, obj_enemy, weapon_cooldown, weapon_reload, stats
+    global recorder, state
     # reset camera offset
-    draw.camera_offset = -SURFACE_CENTER
+    reset_camera(-SURFACE_CENTER)
     # reset game objects
-    player = Player(Vector2(0))
-    obj_bullet, obj_enemy = [], []
-    # reset weapon time
-    weapon_cooldown = 0
-    weapon_reload = 0
-    # reset game stats
-    stats = {"bullets": WEAPON_BULLETS,
-             "distance": 0.0,
-             "hits": 0,
-             "kills": 0,
-             "shots": 0}
+    game.use_entity_store = settings[ENTITY_STORE]
+    game.enemy_lod_interval = PARAMETERS["enemy_lod_interval"]
+    game.reset()
+    # record the new game from its seed
+    recorder = ReplayRecorder(game.seed, SURFACE_SIZE, game.store is not None)
+    if game.enemy_pattern_every != PARAMETERS["enemy_pattern_every"]:
+        recorder.parameter("enemy_pattern_every", game.enemy_pattern_every)
+    apply_quality()
+    rewind.clear()
+    state = None
     print("Game reset.")
 
 def update_video_settings(surface_size: Vector2 = Vector2(settings[SCREEN_WIDTH], settings[SCREEN_HEIGHT]), player_offset: Vector2 = Vector2(0)) -> None:
-    global SURFACE_SIZE, SURFACE_CENTER, ENEMY_SPAWN_DISTANCE, surface_main, surface_fade, UI_BULLET_START_POS
+    global SURFACE_SIZE, SURFACE_CENTER, surface_main, surface_fade, state
     settings[SCREEN_WIDTH] = surface_size.x
     settings[SCREEN_HEIGHT] = surface_size.y
     SURFACE_SIZE = surface_size
     SURFACE_CENTER = SURFACE_SIZE / 2
-    ENEMY_SPAWN_DISTANCE = SURFACE_SIZE.magnitude() * 0.55
     surface_main = create_window(SURFACE_SIZE, RESIZABLE)
     surface_fade = Surface(SURFACE_SIZE)
     surface_fade.fill(PAUSE_OVERLAY_COLOR)
     surface_fade.set_alpha(PAUSE_OVERLAY_COLOR.a)
-    UI_BULLET_START_POS = SURFACE_SIZE - Vector2(UI_BORDER_OFFSET) - IMAGE_BULLET_SIZE
-    draw.camera_offset = player_offset - SURFACE_CENTER
+    reset_camera(player_offset - SURFACE_CENTER)
+    update_render_scale()
+    state = None
+    if game is not None:
+        game.resize(SURFACE_SIZE)
+        if recorder is not None:
+            recorder.resize(SURFACE_SIZE)
     print(f"Resized to {surface_size.x}x{surface_size.y}")
 
-# weapon
-WEAPON_BULLETS = 10
-WEAPON_COOLDOWN_FRAMES = seconds_to_frames(0.2)
-WEAPON_DAMAGE = 1
-WEAPON_RELOAD_FRAMES = seconds_to_frames(1)
-
 # begin main script
 set_window_title(TITLE)
 # program info
 draw = Draw()
+# camera offsets of the last ticks, advanced with the simulation
+camera = Camera()
 clock = Clock()
+# phases are always timed so the flight recorder can keep them
+profiler = FrameProfiler()
+profiler.enabled = True
+# phases of the simulation thread in pipeline mode
+sim_profiler = FrameProfiler()
+sim_profiler.enabled = True
+# simulation phases of the render state drawn this frame, kept with the frame in pipeline mode
+sim_phases: dict[str, float] = {}
+# lowers quality while frames go over budget
+governor = QualityGovernor()
+allocations = AllocationCounter()
+flight_recorder = FlightRecorder(HITCH_DIRECTORY, settings[HITCH_BUDGET])
+# idle frames sleep longer than the budget, the frame after them is not a hitch
+was_idle = False
 input = Vector2(0)
 firing = False
 pause = False
 running = True
-current_enemy_spawn_time = int(ENEMY_SPAWN_RATE / 2)
-current_enemy_despawn_time = ENEMY_DESPAWN_RATE
+# seconds of real time not yet simulated
+accumulator = 0.0
+frame_seconds = 0.0
+ticks = 0
+alpha = 1.0
+# composited frame reused while paused
+static_frame: Surface = None
+# surface the world is drawn to, the main surface at full render scale
+surface_world: Surface = None
+static_key = None
+debug_rect = Rect(0, 0, 0, 0)
+tiles_drawn = 0
+# what the current frame draws, captured again when events change the game
+state: RenderState = None
+# simulates the next frame while the current one renders in pipeline mode
+simulation = SimulationThread()
 # game data
-player: Player = None
-obj_bullet = None
-obj_enemy = None
-weapon_cooldown = None
-weapon_reload = None
-stats = None
+game: Game = None
+recorder: ReplayRecorder = None
+# recent history, rewound a step at a time
+rewind = RewindBuffer()
 # reset game
 update_video_settings()
+startup.begin("game")
+# bullet patterns are turned off when numpy is missing, like the entity store
+pattern_every = settings[ENEMY_PATTERN_EVERY]
+if pattern_every and not patterns_available():
+    print("Enemy bullet patterns need numpy, playing without them")
+    pattern_every = 0
+game = Game(SURFACE_SIZE, settings[ENTITY_STORE], profiler, params={"enemy_pattern_every": pattern_every})
+update_pipeline()
 reset_game()
+startup.begin("first_frame")
 print("Beginning game loop.")
 
 
 # loop
 while running:
 
+    # the game is only touched once the simulation of the last frame is done
+    if simulation.busy:
+        profiler.begin("simulation_wait")
+        state = simulation.wait()
+        record_simulation(state)
+
     # handle events
+    profiler.begin("events")
     for event in get_events():
         match event.type:
             case pg.QUIT:
@@ -236,23 +475,40 @@ while running:
                         running = False
                     # minimize game
                     case pg.K_PAGEDOWN:
-                        if player.is_alive():
+                        if game.player.is_alive():
                             pause = True
                         minimize_window()
                     # handle pause toggling
                     case pg.K_ESCAPE:
-                        if player.is_alive():
+                        if game.player.is_alive():
                             pause = not pause
                     # restart game button
                     case pg.K_SPACE:
-                        if not player.is_alive():
+                        if not game.player.is_alive():
                             reset_game()
+                    # rewind the game
+                    case pg.K_BACKSPACE:
+                        rewind_game()
                     # toggle anti-aliasing
                     case pg.K_F1:
                         toggle_setting(ANTI_ALIASING)
+                    # lower the world render resolution
+                    case pg.K_F2:
+                        cycle_render_scale()
                     # toggle debug info
                     case pg.K_F12:
                         toggle_setting(SHOW_DEBUG_INFO)
+                        state = None
+                    # toggle simulating on a worker thread
+                    case pg.K_F3:
+                        toggle_setting(PIPELINE)
+                        update_pipeline()
+                    # save replay of the current game
+                    case pg.K_F9:
+                        save_replay()
+                    # export phase timings
+                    case pg.K_F10:
+                        export_profile()
                 # movement input press
                 match event.key:
                     case pg.K_w:
@@ -289,158 +545,156 @@ while running:
                     case 1:
                         firing = False
             case pg.VIDEORESIZE:
-                update_video_settings(Vector2(event.w, event.h), player.pos)
+                update_video_settings(Vector2(event.w, event.h), game.player.pos)
                 pause = True
     # end of event handling
 
+    # adapt quality to the work of the last frame, idle frames sleep and are left out
+    if settings[ADAPTIVE_QUALITY] and not was_idle and governor.update(sum(profiler.last_frame.values())) != 0:
+        apply_quality()
+        print(f"Quality stage set to '{governor.name}'")
+
+    if state is None:
+        state = capture_state(alpha, 0)
     # check pause
     if not pause:
 
         # Update
 
-        # spawn enemies around player
-        current_enemy_spawn_time -= 1
-        if current_enemy_spawn_time == 0:
-            current_enemy_spawn_time = ENEMY_SPAWN_RATE
-            obj_enemy.append(Enemy(player.pos + (random_vector() * ENEMY_SPAWN_DISTANCE)))
-        # update player
-        original_pos = player.pos.copy()
-        if player.is_alive():
-            player.update(input)
-            if weapon_cooldown > 0:
-                weapon_cooldown -= 1
-            elif weapon_reload > 0:
-                weapon_reload -= 1
-                if weapon_reload == 0:
-                    # reload finished
-                    stats["bullets"] = WEAPON_BULLETS
-        stats["distance"] += (player.pos - original_pos).length()
-        # fire a bullet in the direction of the mouse if bullets are available
-        # game not paused, player weapon not on cooldown or reloading, and player is alive
-        if firing and not pause and weapon_cooldown == 0 and weapon_reload == 0 and player.is_alive():
-            # update stats
-            stats["bullets"] -= 1
-            stats["shots"] += 1
-            # if last bullet begin reload
-            if stats["bullets"] == 0:
-                weapon_reload = WEAPON_RELOAD_FRAMES
-            # if bullets remain, start cooldown
-            else:
-                weapon_cooldown = WEAPON_COOLDOWN_FRAMES
-            # create new bullet object in front of player
-            direction = get_mouse_direction()
-            obj_bullet.append(Bullet(player.pos + (direction * (PLAYER_RADIUS + BULLET_RADIUS)), direction))
-        # update bullets
-        for bullet in obj_bullet:
-            bullet.update()
-            # check bullet collision
-            for enemy in obj_enemy:
-                # if bullet hits enemy
-                if bullet.is_touching(enemy):
-                    bullet.kill()
-                    enemy.damage(WEAPON_DAMAGE)
-                    stats["hits"] += 1
-        # remove dead game objects
-        obj_bullet = [bullet for bullet in obj_bullet if bullet.is_alive()]
-        enemies = len(obj_enemy)
-        obj_enemy = [enemy for enemy in obj_enemy if enemy.is_alive()]
-        # increment kill for each dead enemy
-        stats["kills"] += enemies - len(obj_enemy)
-        # update enemies
-        for enemy in obj_enemy:
-            enemy.update(player)
-            # test enemy collision
-            for enemy_ in obj_enemy:
-                test_collision(enemy, enemy_)
-        # check despawn timer
-        current_enemy_despawn_time -= 1
-        if current_enemy_despawn_time == 0:
-            current_enemy_despawn_time = ENEMY_DESPAWN_RATE
-            obj_enemy = [enemy for enemy in obj_enemy if (player.pos - enemy.pos).magnitude() < ENEMY_SPAWN_DISTANCE]
-        # update draw object
-        draw.update(surface_main, player.pos, settings[ANTI_ALIASING])
+        # run fixed simulation ticks for the elapsed time
+        accumulator += frame_seconds
+        ticks = 0
+        while accumulator >= TICK_SECONDS and ticks < MAX_CATCH_UP_TICKS:
+            accumulator -= TICK_SECONDS
+            ticks += 1
+        # drop time that could not be caught up to avoid a spiral of death
+        accumulator = min(accumulator, TICK_SECONDS)
+        alpha = accumulator / TICK_SECONDS
+        # every tick of the frame steps with the same inputs at replay precision
+        inputs = quantize_inputs(GameInput(input, firing, get_mouse_direction(game.player.pos)))
+        if settings[PIPELINE]:
+            # the next frame simulates while this one draws the last render state
+            simulation.submit(partial(simulate, ticks, inputs, alpha))
+        else:
+            state = simulate(ticks, inputs, alpha)
+            record_simulation(state)
 
     # Render
 
-    # draw background
-    tiles_drawn = draw.background(surface_main, IMAGE_TILE)
-    # draw game objects
-    player.draw(surface_main, draw, settings[SHOW_DEBUG_INFO])
-    for obj_list in [obj_enemy, obj_bullet]:
-        for obj in obj_list:
-            obj.draw(surface_main, draw, settings[SHOW_DEBUG_INFO])
-    # display appropriate ui
-    if player.is_alive():
+    # paused frames are composited once and reused until something changes
+    frame_key = (pause, state.alive, settings[ANTI_ALIASING], settings[SHOW_AIM_LINE], settings[SHOW_DEBUG_INFO])
+    reuse_frame = static_frame is not None and pause and frame_key == static_key
+    if reuse_frame:
+        # only the debug info changes, restore the area under it and redraw it
+        profiler.begin("ui")
+        dirty_rects = []
+        if settings[SHOW_DEBUG_INFO] and state.alive:
+            surface_main.blit(static_frame, debug_rect, debug_rect)
+            new_debug_rect = draw_debug_info()
+            dirty_rects.append(debug_rect.union(new_debug_rect))
+            debug_rect = new_debug_rect
+        profiler.begin("update_window")
+        if dirty_rects:
+            update_window_rects(dirty_rects)
+    else:
+        # the world is drawn at render scale, ui at window resolution
+        draw.anti_aliasing = settings[ANTI_ALIASING] and governor.anti_aliasing
+        draw.interpolate(state.alpha, state.camera)
+        # draw background
+        profiler.begin("background")
+        tiles_drawn = draw.background(surface_world, ASSETS.image("tile", IMAGE_TILE_SCALE * draw.scale))
+        # draw game objects
+        profiler.begin("entities")
+        # the player, objects, entity store and projectiles, only entities overlapping the screen were captured
+        for circles, lines in state.layers:
+            draw.circles(surface_world, circles)
+            for pos, direction, length in lines:
+                draw.line(surface_world, DEBUG_LINE_COLOR, pos, direction, length, DEBUG_LINE_WIDTH)
+        if state.entities is not None:
+            game.store.draw_visible(surface_world, draw, *state.entities)
+        if state.projectiles is not None:
+            game.projectiles.draw_visible(surface_world, draw, *state.projectiles)
         # draw aim line
-        if not pause and settings[SHOW_AIM_LINE]:
-            draw.line(surface_main, AIM_LINE_COLOR, player.pos + (get_mouse_direction() * (player.radius * 2)), get_mouse_direction(), AIM_LINE_LENGTH, AIM_LINE_WIDTH)
-        # draw health
-        height = SURFACE_SIZE.y - IMAGE_HEART_SIZE.y - UI_BORDER_OFFSET
-        start = SURFACE_CENTER.x - (player._life * (IMAGE_HEART_SIZE.x / 2) + ((player._life - 1) * (IMAGE_HEART_SPACE_SCALE.x / 2)))
-        surface_main.blits([(IMAGE_HEART, (start + ((IMAGE_HEART_SIZE.x + IMAGE_HEART_SPACE_SCALE.x) * i), height)) for i in range(0, player._life)])
-        # draw ammo
-        surface_main.blits([(IMAGE_BULLET, (UI_BULLET_START_POS.x - (IMAGE_BULLET_SIZE.x * i), UI_BULLET_START_POS.y)) for i in range(stats["bullets"])])
-        # draw weapon cooldown
-        if weapon_cooldown != 0:
-            draw_weapon_bar(WEAPON_COOLDOWN_COLOR, weapon_cooldown, WEAPON_COOLDOWN_FRAMES)
-        elif weapon_reload != 0:
-            draw_weapon_bar(WEAPON_RELOAD_COLOR, weapon_reload, WEAPON_RELOAD_FRAMES)
-        # draw debug info
-        if settings[SHOW_DEBUG_INFO]:
-            # these are printed top to bottom
-            debug_info = [f"screen_size: {int(SURFACE_SIZE.x)}x{int(SURFACE_SIZE.y)}",
-                          f"frames_per_second: {clock.get_fps():.3f}",
-                          f"pos_x: {player.pos.x:.3f}",
-                          f"pos_y: {player.pos.y:.3f}",
-                          f"direction_x: {player.direction.x:.3f}",
-                          f"direction_y: {player.direction.y:.3f}",
-                          f"input_x: {input.x}",
-                          f"input_y: {input.y}",
-                          f"firing: {firing}",
-                          f"entity_enemies: {len(obj_enemy)}",
-                          f"entity_bullets: {len(obj_bullet)}",
-                          f"tiles_drawn: {tiles_drawn}",
-                          f"enemy_spawn_time: {current_enemy_spawn_time}",
-                          f"enemy_despawn_time: {current_enemy_despawn_time}",
-                          f"weapon_cooldown: {weapon_cooldown}",
-                          f"weapon_reload: {weapon_reload}",
-                          f"camera_offset_distance: {player.pos.distance_to(draw.camera_offset + SURFACE_CENTER):.3f}"]
-            # blit surfaces
-            surface_main.blit(create_text_surface(DEBUG_FONT_COLOR, FontType.NORMAL, TEXT_DEBUG), (UI_BORDER_OFFSET + 5, UI_BORDER_OFFSET))
-            current_height = UI_BORDER_OFFSET + FONTS[FontType.NORMAL].get_height()
-            surface_main.blits([(create_text_surface(DEBUG_FONT_COLOR, FontType.UI, debug_info[i]), (UI_BORDER_OFFSET + 5, current_height + (FONTS[FontType.UI].get_height() * i))) for i in range(len(debug_info))])
-        # apply pause overlay
-        if pause:
+        if state.alive and not pause and settings[SHOW_AIM_LINE]:
+            aim = get_mouse_direction(state.player_pos)
+            draw.line(surface_world, AIM_LINE_COLOR, state.player_render_pos + (aim * (game.player.radius * 2)), aim, AIM_LINE_LENGTH, AIM_LINE_WIDTH)
+        # scale the world up to the window once per frame
+        if surface_world is not surface_main:
+            profiler.begin("upscale")
+            scale_surface(surface_world, SURFACE_SIZE, surface_main)
+        # display appropriate ui
+        profiler.begin("ui")
+        if state.alive:
+            # draw health, ammo and weapon cooldown from cached layers
+            weapon_bar = None
+            cooldown, reload = state.weapon
+            if cooldown != 0:
+                weapon_bar = (WEAPON_COOLDOWN_COLOR, cooldown)
+            elif reload != 0:
+                weapon_bar = (WEAPON_RELOAD_COLOR, reload)
+            hud.draw(surface_main, draw, state.life, state.stats["bullets"], weapon_bar)
+            # apply pause overlay
+            if pause:
+                surface_apply_fade()
+                surface_text_pause = create_text_surface(PAUSE_FONT_COLOR, FontType.NORMAL, TEXT_PAUSE)
+                surface_main.blit(surface_text_pause, (SURFACE_SIZE - surface_text_pause.get_size()) / 2)
+        else:
+            # apply game over, stats, and restart text
+            stats = state.stats
             surface_apply_fade()
-            surface_text_pause = create_text_surface(PAUSE_FONT_COLOR, FontType.NORMAL, TEXT_PAUSE)
-            surface_main.blit(surface_text_pause, (SURFACE_SIZE - surface_text_pause.get_size()) / 2)
-    else:
-        # apply game over, stats, and restart text
-        surface_apply_fade()
-        center = SURFACE_CENTER.copy()
-        surface_text_gameover = create_text_surface(GAMEOVER_FONT_COLOR, FontType.GAMEOVER, TEXT_GAME_OVER)
-        try:
-            accuracy = (stats["hits"] / stats["shots"]) * 100
-        except:
-            accuracy = 0
-        surface_text_stat_accuracy = create_text_surface(STATS_FONT_COLOR, FontType.UI, f"Accuracy: {accuracy:.3f}")
-        surface_text_stat_kills = create_text_surface(STATS_FONT_COLOR, FontType.UI, f"Kills: " + str(stats["kills"]))
-        surface_text_restart = create_text_surface(RESTART_FONT_COLOR, FontType.NORMAL, TEXT_RESTART)
-        surface_main.blit(surface_text_gameover, center - (Vector2(surface_text_gameover.get_size()) / 2))
-        center.y += surface_text_gameover.get_height()
-        surface_main.blit(surface_text_stat_accuracy, center - (Vector2(surface_text_stat_accuracy.get_size()) / 2))
-        center.y += surface_text_stat_accuracy.get_height()
-        surface_main.blit(surface_text_stat_kills, center - (Vector2(surface_text_stat_kills.get_size()) / 2))
-        center.y += surface_text_gameover.get_height()
-        surface_main.blit(surface_text_restart, center - Vector2(surface_text_restart.get_size()) / 2)
+            center = SURFACE_CENTER.copy()
+            surface_text_gameover = create_text_surface(GAMEOVER_FONT_COLOR, FontType.GAMEOVER, TEXT_GAME_OVER)
+            try:
+                accuracy = (stats["hits"] / stats["shots"]) * 100
+            except:
+                accuracy = 0
+            surface_text_stat_accuracy = create_text_surface(STATS_FONT_COLOR, FontType.UI, f"Accuracy: {accuracy:.3f}")
+            surface_text_stat_kills = create_text_surface(STATS_FONT_COLOR, FontType.UI, f"Kills: " + str(stats["kills"]))
+            surface_text_restart = create_text_surface(RESTART_FONT_COLOR, FontType.NORMAL, TEXT_RESTART)
+            surface_main.blit(surface_text_gameover, center - (Vector2(surface_text_gameover.get_size()) / 2))
+            center.y += surface_text_gameover.get_height()
+            surface_main.blit(surface_text_stat_accuracy, center - (Vector2(surface_text_stat_accuracy.get_size()) / 2))
+            center.y += surface_text_stat_accuracy.get_height()
+            surface_main.blit(surface_text_stat_kills, center - (Vector2(surface_text_stat_kills.get_size()) / 2))
+            center.y += surface_text_gameover.get_height()
+            surface_main.blit(surface_text_restart, center - Vector2(surface_text_restart.get_size()) / 2)
+        # keep a copy of static frames before the debug info is drawn
+        if pause:
+            static_frame = surface_main.copy()
+            static_key = frame_key
+        else:
+            static_frame = None
+        if settings[SHOW_DEBUG_INFO] and state.alive:
+            debug_rect = draw_debug_info()
+        # display surface
+        profiler.begin("update_window")
+        update_window()
     # end of game update
 
-    # display surface
-    update_window()
-    # fps lock
-    clock.tick(FPS)
+    profiler.end_frame()
+    allocations.end_frame()
+    # report startup once the first frame is shown
+    if startup is not None:
+        startup.end_frame()
+        report_startup()
+        startup = None
+    # simulation phases of the render state drawn are kept with it in pipeline mode
+    flight_recorder.end_frame({**profiler.last_frame, **sim_phases}, state.enemies, state.bullets, state.projectile_count, not reuse_frame and not was_idle)
+    sim_phases = {}
+    was_idle = reuse_frame
+    if reuse_frame:
+        # idle while the frame is static, the idle time is not simulated once resumed
+        clock.tick(IDLE_FPS)
+        frame_seconds = 0.0
+    else:
+        # render fps cap, 0 is uncapped
+        frame_seconds = clock.tick(settings[RENDER_FPS]) / 1000
     # end of game loop
 
+# let the last simulation finish before the game is left
+simulation.close()
+# write pending hitch dumps
+flight_recorder.close()
 # save settings
 print("Saving settings...")
 with open(SETTINGS_FILE, "w") as file:
@@ -0,0 +1,34 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from data.replay import Replay
+from data.replay import ReplayError
+
+"""replay script, re-simulates a recorded game headless at maximum speed and verifies its checksums"""
+
+def main() -> None:
+    parser = ArgumentParser(description="play back a replay file without rendering or a frame cap")
+    parser.add_argument("file", help="replay file to play")
+    parser.add_argument("--repeat", type=int, default=1, help="amount of times to play the replay, for benchmarking")
+    args = parser.parse_args()
+    try:
+        replay = Replay.load(args.file)
+        print(f"Seed: {replay.seed}, surface size: {int(replay.surface_size.x)}x{int(replay.surface_size.y)}, entity store: {replay.entity_store}")
+        times = []
+        for _ in range(args.repeat):
+            start = perf_counter()
+            game, verified = replay.play()
+            times.append(perf_counter() - start)
+    except ReplayError as error:
+        print(f"Replay failed: {error}")
+        sys.exit(1)
+    best = min(times)
+    print(f"Played {game.frames} frames in {best:.3f}s ({game.frames / best:.0f} frames per second)")
+    print(f"Verified {verified} checksums")
+    print(f"Stats: {game.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+# headless, must be set before pygame is initialized
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+from argparse import ArgumentParser
+from pygame.math import Vector2
+from time import perf_counter
+from data.game import Game
+from data.policy import POLICIES
+from data.replay import ReplayRecorder
+
+"""headless simulation script, steps the game without rendering or a frame cap"""
+
+SURFACE_SIZE = Vector2(1024, 768)
+
+def main() -> None:
+    parser = ArgumentParser(description="run the game headless at maximum speed")
+    parser.add_argument("--frames", type=int, default=10000, help="amount of frames to simulate")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--policy", choices=POLICIES, default="circle", help="bot policy providing inputs")
+    parser.add_argument("--entity-store", action="store_true", help="use the array-backed entity store")
+    parser.add_argument("--record", help="write the inputs to this replay file")
+    args = parser.parse_args()
+    policy = POLICIES[args.policy]
+    game = Game(SURFACE_SIZE, args.entity_store, seed=args.seed)
+    recorder = ReplayRecorder(game.seed, SURFACE_SIZE, game.store is not None) if args.record else None
+    start = perf_counter()
+    for frame in range(args.frames):
+        inputs = policy(game, frame)
+        game.step(inputs)
+        if recorder is not None:
+            recorder.record(game, inputs)
+    elapsed = perf_counter() - start
+    print(f"Simulated {args.frames} frames in {elapsed:.3f}s ({args.frames / elapsed:.0f} frames per second)")
+    print(f"Player alive: {game.player.is_alive()}")
+    print(f"Stats: {game.stats}")
+    if recorder is not None:
+        print(f"Replay written to {args.record} ({recorder.save(args.record)} bytes)")
+
+if __name__ == "__main__":
+    main()